@@ -0,0 +1,105 @@
+"""
+Микробенчмарк сериализации ответов API.
+
+Сравнивает путь по умолчанию для нетипизированного dict (jsonable_encoder +
+стандартный json в JSONResponse) с типизированным (pydantic-модель ответа +
+ORJSONResponse) на типичных ответах каждого эндпоинта.
+
+Запуск: python -m src.api.bench_serialization --rps 50
+"""
+
+import argparse
+import timeit
+from datetime import date, timedelta
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+
+from src.api import schemas
+from src.domain.hydration.analytics import compute_analytics, SECONDS_PER_DAY
+
+
+def _days_payload(days: int) -> dict:
+    start = date(2026, 1, 1)
+    return {
+        "days": [{"date": (start + timedelta(days=i)).isoformat(), "ml": 1500 + i * 10} for i in range(days)],
+        "goal_ml": 2000,
+    }
+
+
+def _analytics_payload(days: int = 365, logs_per_day: int = 8) -> dict:
+    rng = np.random.default_rng(0)
+    today = date(2026, 10, 19)
+    first_day = (today - date(1970, 1, 1)).days - days + 1
+    day = np.repeat(np.arange(first_day, first_day + days), logs_per_day)
+    ts = day * SECONDS_PER_DAY + rng.integers(7 * 3600, 23 * 3600, day.size)
+    amounts = rng.choice([150, 250, 330, 500], day.size)
+    return compute_analytics(ts, amounts, 2000, today)
+
+
+def _cohort_payload(days: int = 30) -> dict:
+    start = date(2026, 9, 20)
+    return {
+        "generated_at": "2026-10-19T00:00:00+00:00",
+        "days": days,
+        "users": 10000,
+        "goal_ml": {"mean": 2100, "p10": 1500, "p25": 1800, "p50": 2000, "p75": 2500, "p90": 3000},
+        "completion_by_day": [
+            {
+                "date": (start + timedelta(days=i)).isoformat(),
+                "active_users": 6000,
+                "completed_users": 2500,
+                "completion_rate": 0.4167,
+                "completion_rate_all": 0.25,
+            }
+            for i in range(days)
+        ],
+        "reminders_by_period": {
+            p: {"sent": 3000, "responded": 1200, "response_rate": 0.4}
+            for p in ("morning", "day", "evening", "critical")
+        },
+    }
+
+
+CASES = [
+    ("today", schemas.TodayResponse, {"goal_ml": 2000, "consumed_ml": 1250, "default_glass_ml": 250}),
+    ("log/goal/reset", schemas.OkResponse, {"ok": True}),
+    ("stats/days?days=7", schemas.DaysStatsResponse, _days_payload(7)),
+    ("stats/days?days=31", schemas.DaysStatsResponse, _days_payload(31)),
+    ("stats/analytics (1 год)", schemas.AnalyticsResponse, _analytics_payload()),
+    ("admin/cohort", schemas.CohortResponse, _cohort_payload()),
+]
+
+
+def _untyped(payload: dict) -> bytes:
+    return JSONResponse(jsonable_encoder(payload)).body
+
+
+def _typed(adapter: TypeAdapter, payload: dict) -> bytes:
+    return ORJSONResponse(adapter.dump_python(adapter.validate_python(payload), mode="json")).body
+
+
+def _per_call_us(fn, number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rps", type=float, default=50, help="запросов в секунду на эндпоинт")
+    parser.add_argument("--number", type=int, default=2000, help="итераций на замер")
+    args = parser.parse_args()
+
+    print(f"{'endpoint':<26}{'bytes':>8}{'dict+json, µs':>16}{'model+orjson, µs':>19}{'CPU ms/s saved':>17}")
+    for name, model, payload in CASES:
+        adapter = TypeAdapter(model)
+        size = len(_typed(adapter, payload))
+        base = _per_call_us(lambda: _untyped(payload), args.number)
+        fast = _per_call_us(lambda: _typed(adapter, payload), args.number)
+        saved_ms = (base - fast) * args.rps / 1000
+        print(f"{name:<26}{size:>8}{base:>16.1f}{fast:>19.1f}{saved_ms:>17.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,20 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
+from starlette.middleware.gzip import GZipMiddleware
 
-from src.api.routers import webapp
+from src.api.routers import webapp, admin
+from src.api.throttling import ConcurrencyLimitMiddleware
 from src.shared.db import init_db
 from src.shared.config import settings
 
-app = FastAPI(title="Hydration API")
+# orjson по умолчанию: быстрее стандартного json для всех JSON-ответов
+app = FastAPI(title="Hydration API", default_response_class=ORJSONResponse)
+
+# Глобальный предел одновременных запросов к /api (503 вместо очереди к БД).
+# Добавляется до CORS, чтобы ответы 503 тоже получали CORS-заголовки.
+app.add_middleware(ConcurrencyLimitMiddleware, max_concurrency=settings.API_MAX_CONCURRENCY)
 
 # CORS (useful for local dev)
 allowed_origins = [o.strip() for o in (settings.ALLOWED_ORIGINS or "").split(",") if o.strip()]
@@ -21,8 +28,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Сжатие ответов больше COMPRESSION_MIN_SIZE: brotli (если установлен brotli-asgi) с откатом на gzip
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    app.add_middleware(GZipMiddleware, minimum_size=settings.COMPRESSION_MIN_SIZE)
+else:
+    app.add_middleware(BrotliMiddleware, minimum_size=settings.COMPRESSION_MIN_SIZE, gzip_fallback=True)
+
 # Роуты API
 app.include_router(webapp.router)
+app.include_router(admin.router)
 
 @app.on_event("startup")
 def on_startup():
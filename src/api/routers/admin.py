@@ -0,0 +1,56 @@
+import asyncio
+import json
+from datetime import date
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+
+from src.shared.config import settings
+from src.shared.db import session
+from src.api.routers.webapp import tg_user_dep
+from src.api.schemas import CohortResponse, DryRunResponse
+from src.domain.hydration.cohort_stats import latest_cohort_snapshot
+from src.domain.hydration.reminder_service import HydrationReminderService, PERIOD_TARGETS
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+# Сервис без пула ботов — только для симуляции; профили потребления переиспользуются между вызовами
+_dry_run_service: HydrationReminderService | None = None
+
+
+def _admin_ids() -> set[int]:
+    ids = set()
+    for part in (settings.ADMIN_TG_IDS or "").split(","):
+        part = part.strip()
+        if part.isdigit():
+            ids.add(int(part))
+    return ids
+
+async def admin_dep(data=Depends(tg_user_dep)):
+    """Пускает только пользователей из ADMIN_TG_IDS."""
+    if data["user"].get("id") not in _admin_ids():
+        raise HTTPException(403, "admin only")
+    return data
+
+@router.get("/cohort", response_model=CohortResponse)
+async def cohort_stats(_=Depends(admin_dep)):
+    """Последний снапшот когортной статистики (считается периодической задачей)."""
+    with session() as s:
+        snap = latest_cohort_snapshot(s)
+    if not snap:
+        raise HTTPException(404, "cohort snapshot not ready yet")
+    return json.loads(snap.payload)
+
+@router.get("/reminders/dry-run", response_model=DryRunResponse)
+async def reminders_dry_run(
+    hour: int = Query(ge=0, le=23),
+    period: str | None = None,
+    on_date: date | None = Query(default=None, alias="date"),
+    _=Depends(admin_dep),
+):
+    """Пробный прогон напоминаний: сколько сообщений ушло бы и сколько заняла бы рассылка. Ничего не отправляет."""
+    global _dry_run_service
+    if period is not None and period not in PERIOD_TARGETS:
+        raise HTTPException(400, f"period must be one of: {', '.join(PERIOD_TARGETS)}")
+    if _dry_run_service is None:
+        _dry_run_service = HydrationReminderService()
+    return await asyncio.to_thread(_dry_run_service.simulate, hour, period, on_date)
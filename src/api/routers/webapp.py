@@ -4,16 +4,18 @@ import urllib.parse
 import json
 import logging
 from datetime import datetime, timedelta, timezone
-from collections import defaultdict
 
 from fastapi import APIRouter, HTTPException, Header, Depends, Request
 from pydantic import BaseModel
-from sqlmodel import select, delete
 
-from src.shared.config import settings
-from src.shared.db import session
-from src.shared.models import User, WaterLog
-from src.domain.hydration.service import HydrationService as HS
+from src.shared.config import settings, bot_id_from_token
+from src.shared.models import User
+from src.domain.hydration.repository import HydrationRepository, get_repository
+from src.domain.hydration.daily_stats import (
+    get_or_create_user, today_total, add_log, reset_today, set_goal, days_stats, user_analytics,
+)
+from src.api.throttling import TokenBucketLimiter, retry_after_header
+from src.api.schemas import OkResponse, TodayResponse, DaysStatsResponse, AnalyticsResponse
 
 router = APIRouter(prefix="/api/webapp", tags=["webapp"])
 logger = logging.getLogger(__name__)
@@ -83,9 +85,7 @@ def validate_init_data(init_data: str, lifetime: int = 3600) -> dict:
     dcs = _data_check_string(parsed)
 
     # Поддержка нескольких токенов (если один backend обслуживает несколько ботов)
-    tokens: list[str] = [settings.BOT_TOKEN]
-    if settings.ADDITIONAL_BOT_TOKENS:
-        tokens += [t.strip() for t in settings.ADDITIONAL_BOT_TOKENS.split(",") if t.strip()]
+    tokens: list[str] = settings.bot_tokens()
 
     ok, matched = _try_tokens_for_signature(init_data, tokens)
     if not ok:
@@ -105,7 +105,8 @@ def validate_init_data(init_data: str, lifetime: int = 3600) -> dict:
         except Exception:
             pass
 
-    return {"raw": parsed, "user": user}
+    # Запоминаем, через какого бота пришёл пользователь — ему же пойдут напоминания
+    return {"raw": parsed, "user": user, "bot_id": bot_id_from_token(matched)}
 
 def _raw_query_param(request: Request, name: str) -> str | None:
     """Возвращает значение параметра из сырой query-строки без декодирования percent-escape.
@@ -223,15 +224,35 @@ async def debug_auth(
             info["age_seconds"] = None
             info["expired"] = None
 
-    tokens: list[str] = [settings.BOT_TOKEN]
-    if settings.ADDITIONAL_BOT_TOKENS:
-        tokens += [t.strip() for t in settings.ADDITIONAL_BOT_TOKENS.split(",") if t.strip()]
+    tokens = settings.bot_tokens()
     ok, matched = _try_tokens_for_signature(raw, tokens)
     info["signature_ok"] = ok
     info["tokens_tried"] = len(tokens)
     info["matched"] = bool(matched)
+    info["bot_id"] = bot_id_from_token(matched) if matched else None
     return info
 
+# --- Ограничение частоты запросов (по проверенному Telegram user id) ---
+read_limiter = TokenBucketLimiter(
+    settings.RATE_LIMIT_READ_PER_MIN, settings.RATE_LIMIT_READ_BURST, settings.RATE_LIMIT_MAX_KEYS
+)
+write_limiter = TokenBucketLimiter(
+    settings.RATE_LIMIT_WRITE_PER_MIN, settings.RATE_LIMIT_WRITE_BURST, settings.RATE_LIMIT_MAX_KEYS
+)
+
+def _throttle(limiter: TokenBucketLimiter, data: dict):
+    retry_after = limiter.acquire(data["user"].get("id"))
+    if retry_after:
+        raise HTTPException(429, "too many requests", headers=retry_after_header(retry_after))
+
+async def read_user_dep(data=Depends(tg_user_dep)):
+    _throttle(read_limiter, data)
+    return data
+
+async def write_user_dep(data=Depends(tg_user_dep)):
+    _throttle(write_limiter, data)
+    return data
+
 # --- Pydantic модели ---
 class LogRequest(BaseModel):
     amount_ml: int
@@ -239,115 +260,54 @@ class LogRequest(BaseModel):
 class GoalRequest(BaseModel):
     goal_ml: int
 
-@router.get("/today")
-async def today(data=Depends(tg_user_dep)):
+def _require_user(repo: HydrationRepository, uid: int) -> User:
+    u = repo.get_user(uid)
+    if not u:
+        raise HTTPException(404, "user not found")
+    return u
+
+@router.get("/today", response_model=TodayResponse)
+async def today(data=Depends(read_user_dep), repo: HydrationRepository = Depends(get_repository)):
     uid = data["user"].get("id")
-    with session() as s:
-        u = s.exec(select(User).where(User.tg_id == uid)).first()
-        if not u:
-            u = User(tg_id=uid)
-            s.add(u)
-            s.commit()
-            s.refresh(u)
-
-        start, end = HS.local_bounds(u)
-        logs = s.exec(
-            select(WaterLog).where(
-                (WaterLog.user_id == u.id)
-                & (WaterLog.ts_utc >= HS.to_utc(start))
-                & (WaterLog.ts_utc < HS.to_utc(end))
-            )
-        ).all()
-        consumed = sum(l.amount_ml for l in logs)
+    u = get_or_create_user(repo, uid, data.get("bot_id"))
     return {
         "goal_ml": u.goal_ml,
-        "consumed_ml": consumed,
+        "consumed_ml": today_total(repo, u),
         "default_glass_ml": u.default_glass_ml,
     }
 
-@router.post("/log")
-async def log(payload: LogRequest, data=Depends(tg_user_dep)):
+@router.post("/log", response_model=OkResponse)
+async def log(payload: LogRequest, data=Depends(write_user_dep), repo: HydrationRepository = Depends(get_repository)):
     uid = data["user"].get("id")
     if payload.amount_ml == 0:
         raise HTTPException(400, "amount_ml != 0 required")
-    with session() as s:
-        u = s.exec(select(User).where(User.tg_id == uid)).first()
-        if not u:
-            raise HTTPException(404, "user not found")
-        s.add(
-            WaterLog(
-                user_id=u.id,
-                ts_utc=datetime.utcnow().replace(tzinfo=timezone.utc),
-                amount_ml=payload.amount_ml,
-                source="webapp",
-            )
-        )
-        s.commit()
+    add_log(repo, _require_user(repo, uid), payload.amount_ml, source="webapp")
     return {"ok": True}
 
-@router.get("/stats/days")
-async def stats_days(days: int = 7, data=Depends(tg_user_dep)):
+@router.get("/stats/days", response_model=DaysStatsResponse)
+async def stats_days(days: int = 7, data=Depends(read_user_dep), repo: HydrationRepository = Depends(get_repository)):
     days = max(1, min(31, days))
     uid = data["user"].get("id")
-    with session() as s:
-        u = s.exec(select(User).where(User.tg_id == uid)).first()
-        if not u:
-            raise HTTPException(404, "user not found")
-        end_local = HS.user_now(u).replace(hour=23, minute=59, second=59, microsecond=0)
-        start_local = (end_local - timedelta(days=days - 1)).replace(
-            hour=0, minute=0, second=0, microsecond=0
-        )
-        logs = s.exec(
-            select(WaterLog).where(
-                (WaterLog.user_id == u.id)
-                & (WaterLog.ts_utc >= HS.to_utc(start_local))
-                & (WaterLog.ts_utc <= HS.to_utc(end_local))
-            )
-        ).all()
-
-    totals = defaultdict(int)
-    for l in logs:
-        d_local = HS.from_utc(l.ts_utc, u).date().isoformat()
-        totals[d_local] += l.amount_ml
-
-    out = []
-    cur = start_local.date()
-    while cur <= end_local.date():
-        iso = cur.isoformat()
-        out.append({"date": iso, "ml": totals.get(iso, 0)})
-        cur = cur + timedelta(days=1)
-
-    return {"days": out, "goal_ml": u.goal_ml}
-
-@router.post("/goal")
-async def update_goal(payload: GoalRequest, data=Depends(tg_user_dep)):
+    # Закрытые дни берутся из кэша, из репозитория дочитывается только недостающее
+    return days_stats(repo, _require_user(repo, uid), days)
+
+@router.get("/stats/analytics", response_model=AnalyticsResponse)
+async def stats_analytics(data=Depends(read_user_dep), repo: HydrationRepository = Depends(get_repository)):
+    """Серии, недельные/месячные/годовые итоги и профиль по часам за всю историю."""
+    uid = data["user"].get("id")
+    return user_analytics(repo, _require_user(repo, uid))
+
+@router.post("/goal", response_model=OkResponse)
+async def update_goal(payload: GoalRequest, data=Depends(write_user_dep), repo: HydrationRepository = Depends(get_repository)):
     uid = data["user"].get("id")
     if payload.goal_ml < 500 or payload.goal_ml > 10000:
         raise HTTPException(400, "goal_ml must be between 500 and 10000")
-    with session() as s:
-        u = s.exec(select(User).where(User.tg_id == uid)).first()
-        if not u:
-            raise HTTPException(404, "user not found")
-        u.goal_ml = payload.goal_ml
-        s.add(u)
-        s.commit()
+    set_goal(repo, _require_user(repo, uid), payload.goal_ml)
     return {"ok": True}
 
-@router.post("/reset")
-async def reset(data=Depends(tg_user_dep)):
+@router.post("/reset", response_model=OkResponse)
+async def reset(data=Depends(write_user_dep), repo: HydrationRepository = Depends(get_repository)):
     uid = data["user"].get("id")
-    with session() as s:
-        u = s.exec(select(User).where(User.tg_id == uid)).first()
-        if not u:
-            raise HTTPException(404, "user not found")
-        # удалить все записи за сегодня (в локальном дне пользователя)
-        start, end = HS.local_bounds(u)
-        s.exec(
-            delete(WaterLog).where(
-                (WaterLog.user_id == u.id)
-                & (WaterLog.ts_utc >= HS.to_utc(start))
-                & (WaterLog.ts_utc < HS.to_utc(end))
-            )
-        )
-        s.commit()
+    # удалить все записи за сегодня (в локальном дне пользователя)
+    reset_today(repo, _require_user(repo, uid))
     return {"ok": True}
@@ -0,0 +1,120 @@
+"""
+Модели ответов API.
+
+Явные модели дают FastAPI быстрый путь сериализации (pydantic-core вместо
+jsonable_encoder) и документируют формат ответов для фронта.
+"""
+
+from pydantic import BaseModel
+
+
+class OkResponse(BaseModel):
+    ok: bool = True
+
+
+class TodayResponse(BaseModel):
+    goal_ml: int
+    consumed_ml: int
+    default_glass_ml: int
+
+
+class DayStat(BaseModel):
+    date: str
+    ml: int
+
+
+class DaysStatsResponse(BaseModel):
+    days: list[DayStat]
+    goal_ml: int
+
+
+class StreakStats(BaseModel):
+    current: int
+    best: int
+
+
+class AverageStats(BaseModel):
+    week: int
+    month: int
+    year: int
+    all_time: int
+
+
+class RollupStats(BaseModel):
+    start: str
+    total_ml: int
+    avg_ml: int
+    days: int
+    goal_days: int
+
+
+class AnalyticsResponse(BaseModel):
+    goal_ml: int
+    first_date: str
+    days_tracked: int
+    total_ml: int
+    goal_days: int
+    streak: StreakStats
+    averages: AverageStats
+    weeks: list[RollupStats]
+    months: list[RollupStats]
+    years: list[RollupStats]
+    hourly_ml: list[int]
+    hourly_avg_ml: list[int]
+
+
+# --- Админка ---
+
+class GoalDistribution(BaseModel):
+    mean: int | None
+    p10: int | None
+    p25: int | None
+    p50: int | None
+    p75: int | None
+    p90: int | None
+
+
+class CompletionDay(BaseModel):
+    date: str
+    active_users: int
+    completed_users: int
+    completion_rate: float
+    completion_rate_all: float
+
+
+class ReminderPeriodStats(BaseModel):
+    sent: int
+    responded: int
+    response_rate: float
+
+
+class CohortResponse(BaseModel):
+    generated_at: str
+    days: int
+    users: int
+    goal_ml: GoalDistribution
+    completion_by_day: list[CompletionDay]
+    reminders_by_period: dict[str, ReminderPeriodStats]
+
+
+class DryRunPeriod(BaseModel):
+    users: int
+    send: int
+    quiet: int
+    limit: int
+    duplicate: int
+    on_track: int
+    predicted: int
+    by_bot: dict[str, int]
+    estimated_dispatch_s: float | None
+
+
+class DryRunResponse(BaseModel):
+    date: str
+    hour: int
+    bots: int
+    rate_per_bot: float
+    periods: dict[str, DryRunPeriod]
+    queries: int
+    db_time_ms: float
+    elapsed_ms: float
@@ -0,0 +1,83 @@
+"""
+Ограничение частоты запросов к API.
+
+- TokenBucketLimiter — token bucket на ключ (Telegram user id) с ограниченной
+  памятью: LRU-вытеснение и удаление «простаивающих» ключей, у которых бакет
+  уже полностью восстановился бы.
+- ConcurrencyLimitMiddleware — глобальный предел одновременных запросов к /api:
+  лишние сразу получают 503, не вставая в очередь к единственному писателю SQLite.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from starlette.responses import JSONResponse
+
+
+class TokenBucketLimiter:
+    def __init__(self, rate_per_min: float, burst: int, max_keys: int = 10000):
+        self.rate = rate_per_min / 60.0  # токенов в секунду
+        self.burst = burst
+        self.max_keys = max_keys
+        # Через это время простоя бакет полон — состояние ключа можно забыть
+        self.idle_ttl = burst / self.rate if self.rate > 0 else float("inf")
+        self._buckets: OrderedDict[object, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def acquire(self, key, now: float | None = None) -> float:
+        """Списывает токен. Возвращает 0, если запрос разрешён, иначе — через сколько секунд повторить."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - last) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                retry_after = 0.0
+            else:
+                retry_after = (1 - tokens) / self.rate if self.rate > 0 else float("inf")
+            self._buckets[key] = (tokens, now)
+            self._evict(now)
+            return retry_after
+
+    def _evict(self, now: float):
+        # Ключи упорядочены по последнему обращению — самые старые в начале
+        while self._buckets:
+            key, (_, last) = next(iter(self._buckets.items()))
+            if len(self._buckets) <= self.max_keys and now - last < self.idle_ttl:
+                break
+            self._buckets.popitem(last=False)
+
+
+def retry_after_header(seconds: float) -> dict:
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
+
+
+class ConcurrencyLimitMiddleware:
+    """ASGI middleware: не больше `max_concurrency` одновременных запросов с путём `path_prefix`."""
+
+    def __init__(self, app, max_concurrency: int, path_prefix: str = "/api"):
+        self.app = app
+        self.max_concurrency = max_concurrency
+        self.path_prefix = path_prefix
+        self.in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+        if self.in_flight >= self.max_concurrency:
+            response = JSONResponse(
+                {"detail": "server busy, retry later"}, status_code=503, headers=retry_after_header(1)
+            )
+            await response(scope, receive, send)
+            return
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
@@ -0,0 +1,35 @@
+"""Inline-клавиатуры бота: быстрая запись воды прямо из чата."""
+
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+
+class QuickLogCallback(CallbackData, prefix="h2o"):
+    action: str  # log | today | week
+    amount: int = 0
+
+
+def _button(text: str, action: str, amount: int = 0) -> InlineKeyboardButton:
+    return InlineKeyboardButton(text=text, callback_data=QuickLogCallback(action=action, amount=amount).pack())
+
+
+def quick_log_keyboard(glass_ml: int) -> InlineKeyboardMarkup:
+    """Кнопки «±стакан» и быстрые итоги; используется в ответах на команды и в напоминаниях."""
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                _button(f"➖ {glass_ml} мл", "log", -glass_ml),
+                _button(f"💧 +{glass_ml} мл", "log", glass_ml),
+                _button(f"💧 +{glass_ml * 2} мл", "log", glass_ml * 2),
+            ],
+            [
+                _button("📊 Сегодня", "today"),
+                _button("📅 Неделя", "week"),
+            ],
+        ]
+    )
+
+
+def reminder_keyboard(user) -> InlineKeyboardMarkup:
+    """Клавиатура под напоминанием: отметить стакан прямо из сообщения."""
+    return quick_log_keyboard(user.default_glass_ml)
@@ -1,21 +1,31 @@
 import asyncio
 import logging
-from aiogram import Bot, Dispatcher, Router, F
-from aiogram.types import Message, ReplyKeyboardMarkup, KeyboardButton, WebAppInfo
-from aiogram.filters import CommandStart
+from datetime import date, datetime
+from aiogram import Dispatcher, Router, F
+from aiogram.types import Message, CallbackQuery, ReplyKeyboardMarkup, KeyboardButton, WebAppInfo
+from aiogram.filters import CommandStart, Command
+from apscheduler.triggers.interval import IntervalTrigger
 from src.shared.config import settings
+from src.shared.db import init_db
 from src.domain.hydration.reminder_service import HydrationReminderService
+from src.domain.hydration.cohort_stats import run_cohort_job
+from src.bot.pool import BotPool
+from src.bot.keyboards import QuickLogCallback, quick_log_keyboard, reminder_keyboard
+from src.domain.hydration.repository import get_repository
+from src.domain.hydration.daily_stats import get_or_create_user, today_total, add_log, days_stats
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-bot = Bot(token=settings.BOT_TOKEN)
+# По боту на каждый токен; все боты обслуживаются одним диспетчером
+bots = BotPool()
+repo = get_repository()
 dp = Dispatcher()
 router = Router()
 
 # Инициализация сервиса напоминаний
-reminder_service = HydrationReminderService(bot)
+reminder_service = HydrationReminderService(bots, repo, reply_markup=reminder_keyboard)
 
 @router.message(CommandStart())
 async def start_cmd(msg: Message):
@@ -24,25 +34,92 @@ async def start_cmd(msg: Message):
         resize_keyboard=True
     )
     await msg.answer(
-        "👋 Привет! Я помогу тебе пить воду 💧\nНажми, чтобы открыть мини‑приложение:",
+        "👋 Привет! Я помогу тебе пить воду 💧\nНажми, чтобы открыть мини‑приложение:\n\n"
+        "Записать стакан можно и прямо в чате: /today — прогресс за сегодня, /week — за неделю.",
         reply_markup=kb,
     )
 
+WEEKDAYS = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
+
+def _progress_bar(ml: int, goal_ml: int, width: int = 10) -> str:
+    filled = min(width, max(0, round(ml / goal_ml * width))) if goal_ml > 0 else 0
+    return "▓" * filled + "░" * (width - filled)
+
+def _today_text(total_ml: int, goal_ml: int) -> str:
+    percent = total_ml / goal_ml * 100 if goal_ml > 0 else 0
+    return (
+        f"📊 <b>Сегодня</b>: {total_ml} из {goal_ml} мл ({percent:.0f}%)\n"
+        f"{_progress_bar(total_ml, goal_ml)}"
+    )
+
+def _week_text(stats: dict) -> str:
+    goal_ml = stats["goal_ml"]
+    lines = ["📅 <b>Последние 7 дней</b>"]
+    for day in stats["days"]:
+        d = date.fromisoformat(day["date"])
+        mark = "✅" if day["ml"] >= goal_ml else ""
+        lines.append(f"{WEEKDAYS[d.weekday()]} {d:%d.%m} {_progress_bar(day['ml'], goal_ml)} {day['ml']} мл {mark}")
+    return "\n".join(lines)
+
+@router.message(Command("today"))
+async def today_cmd(msg: Message):
+    u = get_or_create_user(repo, msg.from_user.id, msg.bot.id)
+    text = _today_text(today_total(repo, u), u.goal_ml)
+    kb = quick_log_keyboard(u.default_glass_ml)
+    await msg.answer(text, reply_markup=kb, parse_mode="HTML")
+
+@router.message(Command("week"))
+async def week_cmd(msg: Message):
+    u = get_or_create_user(repo, msg.from_user.id, msg.bot.id)
+    text = _week_text(days_stats(repo, u, 7))
+    kb = quick_log_keyboard(u.default_glass_ml)
+    await msg.answer(text, reply_markup=kb, parse_mode="HTML")
+
+@router.callback_query(QuickLogCallback.filter())
+async def quick_log_cb(cb: CallbackQuery, callback_data: QuickLogCallback):
+    """Кнопки под сообщениями: запись воды одним нажатием без открытия мини‑приложения."""
+    u = get_or_create_user(repo, cb.from_user.id, cb.bot.id)
+    if callback_data.action == "log" and callback_data.amount:
+        add_log(repo, u, callback_data.amount, source="bot")
+        total = today_total(repo, u)
+        await cb.answer(f"💧 {callback_data.amount:+d} мл · {total} из {u.goal_ml} мл")
+        return
+    if callback_data.action == "week":
+        text = _week_text(days_stats(repo, u, 7))
+    else:
+        text = _today_text(today_total(repo, u), u.goal_ml)
+    await cb.answer()
+    if cb.message:
+        await cb.message.answer(text, parse_mode="HTML")
+
 dp.include_router(router)
 
 async def main():
     try:
+        # Схема БД (новые таблицы/колонки) — до первой проверки напоминаний
+        init_db()
+        
         # Запускаем сервис напоминаний
         await reminder_service.start()
         logger.info("Сервис напоминаний запущен")
+
+        # Периодический пересчёт когортной статистики для админки
+        reminder_service.scheduler.add_job(
+            run_cohort_job,
+            IntervalTrigger(minutes=settings.COHORT_STATS_INTERVAL_MIN),
+            id="cohort_stats_refresh",
+            next_run_time=datetime.now(),  # первый снапшот — сразу после старта
+            replace_existing=True,
+        )
         
         # Запускаем бота
-        await dp.start_polling(bot)
+        await dp.start_polling(*bots.bots.values())
     except Exception as e:
         logger.error(f"Ошибка при запуске: {e}")
     finally:
         # Останавливаем сервис напоминаний при завершении
         await reminder_service.stop()
+        await bots.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
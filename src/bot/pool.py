@@ -0,0 +1,83 @@
+"""
+Пул ботов: по экземпляру Bot на каждый токен (BOT_TOKEN + ADDITIONAL_BOT_TOKENS)
+с общей HTTP-сессией.
+
+У каждого токена свой лимит Telegram на отправку, поэтому у каждого бота свой
+ограничитель скорости: сообщения через разных ботов уходят параллельно, и общая
+пропускная способность растёт с числом ботов.
+"""
+
+import asyncio
+import logging
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.exceptions import TelegramRetryAfter
+
+from src.shared.config import settings, bot_id_from_token
+from src.domain.hydration.sender import MessageSender
+
+logger = logging.getLogger(__name__)
+
+
+class _RateLimiter:
+    """Равномерно распределяет вызовы: не чаще `rate` в секунду."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            delay = self._next - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next = max(self._next, loop.time()) + self.interval
+
+
+class BotPool(MessageSender):
+    def __init__(self, tokens: list[str] | None = None, rate_per_sec: float | None = None):
+        tokens = tokens or settings.bot_tokens()
+        rate = rate_per_sec if rate_per_sec is not None else settings.BOT_SEND_RATE_PER_SEC
+        self.rate_per_sec = rate
+        self.session = AiohttpSession()
+        self.bots: dict[int | None, Bot] = {}
+        self._limiters: dict[int | None, _RateLimiter] = {}
+        for token in tokens:
+            bot_id = bot_id_from_token(token)
+            if bot_id in self.bots:
+                continue
+            self.bots[bot_id] = Bot(token=token, session=self.session)
+            self._limiters[bot_id] = _RateLimiter(rate)
+        self.default_id = bot_id_from_token(tokens[0])
+
+    def __len__(self) -> int:
+        return len(self.bots)
+
+    @property
+    def default(self) -> Bot:
+        return self.bots[self.default_id]
+
+    def resolve(self, bot_id: int | None) -> int | None:
+        """id бота из пула для пользователя (неизвестный или пустой — основной бот)."""
+        return bot_id if bot_id in self.bots else self.default_id
+
+    def get(self, bot_id: int | None) -> Bot:
+        return self.bots[self.resolve(bot_id)]
+
+    async def send_message(self, bot_id: int | None, **kwargs):
+        """Отправляет сообщение через бота пользователя с учётом его лимита скорости."""
+        bot_id = self.resolve(bot_id)
+        await self._limiters[bot_id].wait()
+        try:
+            return await self.bots[bot_id].send_message(**kwargs)
+        except TelegramRetryAfter as e:
+            # Telegram просит подождать — ждём и пробуем ещё раз
+            logger.warning(f"Бот {bot_id}: превышен лимит, повтор через {e.retry_after} с")
+            await asyncio.sleep(e.retry_after)
+            return await self.bots[bot_id].send_message(**kwargs)
+
+    async def close(self):
+        await self.session.close()
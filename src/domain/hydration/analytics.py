@@ -0,0 +1,173 @@
+"""
+Долгосрочная аналитика пользователя: серии выполнения цели, недельные/месячные/годовые
+средние и профиль потребления по часам суток.
+
+Вся история пользователя превращается в посуточный ряд, дальше всё считается
+векторно (NumPy) без циклов по записям. Результат кэшируется на пользователя
+до следующей записи в журнал (или до смены локальной даты).
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import date, timezone
+
+import numpy as np
+
+from src.shared.models import User
+from src.domain.hydration.service import HydrationService as HS
+
+SECONDS_PER_DAY = 86400
+# 1970-01-01 — четверг; сдвиг на 3 дня выравнивает недели по понедельникам
+_EPOCH_WEEK_SHIFT = 3
+_EPOCH_DAY = np.datetime64("1970-01-01", "D")
+
+
+def epoch_seconds(values) -> np.ndarray:
+    """datetime из БД (naive UTC в SQLite, aware в других СУБД) -> секунды от epoch (int64)."""
+    naive = [v.astimezone(timezone.utc).replace(tzinfo=None) if v.tzinfo else v for v in values]
+    return np.array(naive, dtype="datetime64[s]").astype(np.int64)
+
+
+def _runs(mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Границы серий True: серия i занимает [starts[i], ends[i])."""
+    padded = np.concatenate(([0], mask.astype(np.int8), [0]))
+    d = np.diff(padded)
+    return np.flatnonzero(d == 1), np.flatnonzero(d == -1)
+
+
+def _rollup(keys: np.ndarray, daily: np.ndarray, met: np.ndarray):
+    """Группирует посуточный ряд по монотонному ключу (неделя/месяц/год)."""
+    uniq, starts = np.unique(keys, return_index=True)
+    totals = np.add.reduceat(daily, starts)
+    counts = np.diff(np.append(starts, keys.size))
+    goal_days = np.add.reduceat(met.astype(np.int64), starts)
+    return uniq, totals, counts, goal_days
+
+
+def _rollup_rows(labels: list[str], totals, counts, goal_days) -> list[dict]:
+    avgs = np.rint(totals / counts).astype(np.int64).tolist()
+    return [
+        {"start": label, "total_ml": int(t), "avg_ml": a, "days": int(c), "goal_days": int(g)}
+        for label, t, a, c, g in zip(labels, totals.tolist(), avgs, counts.tolist(), goal_days.tolist())
+    ]
+
+
+def compute_analytics(
+    ts: np.ndarray, amounts: np.ndarray, goal_ml: int, today: date, utc_offset_s: int = 0
+) -> dict:
+    """
+    Считает аналитику по массивам времени (секунды epoch, UTC) и объёмов (мл).
+
+    Args:
+        ts: Время записей, секунды от epoch в UTC
+        amounts: Объёмы записей в мл (могут быть отрицательными — корректировки)
+        goal_ml: Дневная цель пользователя
+        today: Локальная дата пользователя
+        utc_offset_s: Смещение локального времени пользователя от UTC, секунды
+    """
+    today_idx = (today - date(1970, 1, 1)).days
+    local = ts.astype(np.int64) + utc_offset_s
+    day_idx = local // SECONDS_PER_DAY
+    keep = day_idx <= today_idx
+    local, day_idx = local[keep], day_idx[keep]
+    weights = amounts[keep].astype(np.float64)
+
+    first_idx = int(day_idx.min()) if day_idx.size else today_idx
+    n_days = today_idx - first_idx + 1
+    daily = np.bincount(day_idx - first_idx, weights=weights, minlength=n_days)
+    met = daily >= goal_ml if goal_ml > 0 else np.zeros(n_days, dtype=bool)
+
+    # Серии: текущая может заканчиваться вчера — сегодняшний день ещё не закончен
+    starts, ends = _runs(met)
+    lengths = ends - starts
+    best_streak = int(lengths.max()) if lengths.size else 0
+    current_streak = int(lengths[-1]) if ends.size and ends[-1] >= n_days - 1 else 0
+
+    days = _EPOCH_DAY + np.arange(first_idx, today_idx + 1)
+    week_keys = (np.arange(first_idx, today_idx + 1) + _EPOCH_WEEK_SHIFT) // 7
+    weeks, w_tot, w_cnt, w_goal = _rollup(week_keys, daily, met)
+    week_labels = (_EPOCH_DAY + (weeks * 7 - _EPOCH_WEEK_SHIFT)).astype(str).tolist()
+    months, m_tot, m_cnt, m_goal = _rollup(days.astype("datetime64[M]"), daily, met)
+    years, y_tot, y_cnt, y_goal = _rollup(days.astype("datetime64[Y]"), daily, met)
+
+    hours = (local % SECONDS_PER_DAY) // 3600
+    hourly = np.bincount(hours, weights=weights, minlength=24)
+
+    def _avg(window: int) -> int:
+        return int(np.rint(daily[-window:].mean()))
+
+    return {
+        "goal_ml": goal_ml,
+        "first_date": str(days[0]),
+        "days_tracked": n_days,
+        "total_ml": int(daily.sum()),
+        "goal_days": int(met.sum()),
+        "streak": {"current": current_streak, "best": best_streak},
+        "averages": {
+            "week": _avg(7),
+            "month": _avg(30),
+            "year": _avg(365),
+            "all_time": _avg(n_days),
+        },
+        "weeks": _rollup_rows(week_labels, w_tot, w_cnt, w_goal),
+        "months": _rollup_rows(months.astype(str).tolist(), m_tot, m_cnt, m_goal),
+        "years": _rollup_rows(years.astype(str).tolist(), y_tot, y_cnt, y_goal),
+        "hourly_ml": np.rint(hourly).astype(np.int64).tolist(),
+        "hourly_avg_ml": np.rint(hourly / n_days).astype(np.int64).tolist(),
+    }
+
+
+class AnalyticsCache:
+    """
+    LRU-кэш результатов аналитики: ключ — пользователь, значение действительно
+    до смены даты и пока совпадает сигнатура (например, сегодняшний итог —
+    так видны записи, сделанные другим процессом, например ботом).
+    """
+
+    def __init__(self, max_users: int = 2048):
+        self.max_users = max_users
+        self._data: OrderedDict[int, tuple[date, object, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, today: date, signature=None) -> dict | None:
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is None or entry[0] != today or entry[1] != signature:
+                return None
+            self._data.move_to_end(user_id)
+            return entry[2]
+
+    def set(self, user_id: int, today: date, value: dict, signature=None) -> None:
+        with self._lock:
+            self._data[user_id] = (today, signature, value)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.max_users:
+                self._data.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._data.pop(user_id, None)
+
+
+analytics_cache = AnalyticsCache()
+
+
+def get_user_analytics(repo, u: User, today_ml: int | None = None) -> dict:
+    """
+    Аналитика по всей истории пользователя (из кэша, если журнал не менялся).
+    `today_ml` — текущий итог за сегодня, сверяется с закэшированным.
+    """
+    now = HS.user_now(u)
+    today = now.date()
+    signature = (today_ml, u.goal_ml)
+    cached = analytics_cache.get(u.id, today, signature)
+    if cached is not None:
+        return cached
+
+    ts, amounts = repo.user_log_arrays(u.id)
+    offset = now.utcoffset()
+    result = compute_analytics(
+        ts, amounts, u.goal_ml, today, int(offset.total_seconds()) if offset else 0
+    )
+    analytics_cache.set(u.id, today, result, signature)
+    return result
@@ -0,0 +1,235 @@
+"""
+Агрегированная статистика по всем пользователям (для админки).
+
+Периодическая batch-задача читает User, WaterLog и ReminderLog чанками
+(keyset-пагинация по id) в компактные массивы NumPy, векторно считает
+перцентили и доли выполнения цели и сохраняет снапшот в CohortSnapshot.
+Эндпоинт админки отдаёт последний снапшот, не сканируя сырые таблицы.
+
+Запуск вручную: python -m src.domain.hydration.cohort_stats
+"""
+
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlmodel import select, delete
+
+from src.shared.config import settings
+from src.shared.db import session
+from src.shared.models import User, WaterLog, ReminderLog, CohortSnapshot
+from src.domain.hydration.analytics import SECONDS_PER_DAY, epoch_seconds
+
+logger = logging.getLogger(__name__)
+
+GOAL_PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def _int64(values) -> np.ndarray:
+    return np.array(values, dtype=np.int64)
+
+
+def _str(values) -> np.ndarray:
+    return np.array(values, dtype=str)
+
+
+def _stream_columns(db, model, columns, converters, where=None, chunk: int = 5000) -> list[np.ndarray]:
+    """
+    Читает колонки таблицы чанками по id; каждый чанк сразу превращается в
+    типизированные массивы (`converters` — по функции на колонку), в конце
+    массивы склеиваются. В памяти одновременно не больше одного чанка строк.
+    """
+    parts: list[list[np.ndarray]] = [[] for _ in columns]
+    last_id = 0
+    while True:
+        stmt = select(model.id, *columns).where(model.id > last_id)
+        if where is not None:
+            stmt = stmt.where(where)
+        rows = db.exec(stmt.order_by(model.id).limit(chunk)).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        for i, convert in enumerate(converters):
+            parts[i].append(convert([r[i + 1] for r in rows]))
+        if len(rows) < chunk:
+            break
+    return [
+        np.concatenate(chunks) if chunks else convert([])
+        for chunks, convert in zip(parts, converters)
+    ]
+
+
+def _percentiles(values: np.ndarray) -> dict:
+    if not values.size:
+        return {f"p{p}": None for p in GOAL_PERCENTILES}
+    qs = np.percentile(values, GOAL_PERCENTILES)
+    return {f"p{p}": int(round(q)) for p, q in zip(GOAL_PERCENTILES, qs)}
+
+
+def compute_cohort_stats(
+    user_ids: np.ndarray,
+    goals: np.ndarray,
+    log_uids: np.ndarray,
+    log_ts: np.ndarray,
+    log_amounts: np.ndarray,
+    rem_uids: np.ndarray,
+    rem_ts: np.ndarray,
+    rem_periods: np.ndarray,
+    since_day: int,
+    n_days: int,
+    response_window_s: int,
+) -> dict:
+    """
+    Векторный расчёт когортных метрик.
+
+    Args:
+        user_ids: id пользователей (отсортированы по возрастанию)
+        goals: goal_ml пользователей в том же порядке
+        log_uids, log_ts, log_amounts: записи журнала (ts — секунды epoch UTC)
+        rem_uids, rem_ts, rem_periods: отправленные напоминания
+        since_day: Первый день окна (номер дня от epoch)
+        n_days: Длина окна в днях
+        response_window_s: Окно, в течение которого приём воды считается реакцией на напоминание
+    """
+    n_users = user_ids.size
+
+    # Сопоставляем записи с позициями пользователей; «осиротевшие» записи отбрасываем
+    pos = np.searchsorted(user_ids, log_uids)
+    pos_ok = pos < n_users
+    pos_ok[pos_ok] = user_ids[pos[pos_ok]] == log_uids[pos_ok]
+    day = log_ts // SECONDS_PER_DAY - since_day
+    valid = pos_ok & (day >= 0) & (day < n_days)
+    pos, day, amounts = pos[valid], day[valid], log_amounts[valid].astype(np.float64)
+
+    # Суммы по (пользователь, день) без плотной матрицы
+    keys = pos * n_days + day
+    uniq, inverse = np.unique(keys, return_inverse=True)
+    sums = np.bincount(inverse, weights=amounts, minlength=uniq.size)
+    ud_user, ud_day = uniq // n_days, uniq % n_days
+    completed = (goals[ud_user] > 0) & (sums >= goals[ud_user])
+    active_per_day = np.bincount(ud_day, minlength=n_days)
+    completed_per_day = np.bincount(ud_day[completed], minlength=n_days)
+    safe_active = np.maximum(active_per_day, 1)
+
+    dates = (np.datetime64("1970-01-01", "D") + since_day + np.arange(n_days)).astype(str).tolist()
+    completion = [
+        {
+            "date": d,
+            "active_users": int(a),
+            "completed_users": int(c),
+            "completion_rate": round(float(c) / sa, 4),
+            "completion_rate_all": round(float(c) / n_users, 4) if n_users else 0.0,
+        }
+        for d, a, c, sa in zip(
+            dates, active_per_day.tolist(), completed_per_day.tolist(), safe_active.tolist()
+        )
+    ]
+
+    # Реакция на напоминания: есть ли приём воды в окне после отправки.
+    # Ключ (user_id << 32 | ts) сортируется сначала по пользователю, затем по времени.
+    intake = log_amounts > 0
+    log_keys = np.sort((log_uids[intake].astype(np.int64) << 32) | log_ts[intake])
+    rem_keys = (rem_uids.astype(np.int64) << 32) | rem_ts
+    idx = np.searchsorted(log_keys, rem_keys, side="right")
+    has_next = idx < log_keys.size
+    responded = np.zeros(rem_keys.size, dtype=bool)
+    responded[has_next] = log_keys[idx[has_next]] - rem_keys[has_next] <= response_window_s
+
+    reminders = {}
+    if rem_periods.size:
+        periods, p_inv = np.unique(rem_periods, return_inverse=True)
+        sent = np.bincount(p_inv, minlength=periods.size)
+        resp = np.bincount(p_inv[responded], minlength=periods.size)
+        for p, s_cnt, r_cnt in zip(periods.tolist(), sent.tolist(), resp.tolist()):
+            reminders[p] = {
+                "sent": int(s_cnt),
+                "responded": int(r_cnt),
+                "response_rate": round(r_cnt / s_cnt, 4) if s_cnt else 0.0,
+            }
+
+    return {
+        "users": int(n_users),
+        "goal_ml": {
+            "mean": int(round(float(goals.mean()))) if n_users else None,
+            **_percentiles(goals),
+        },
+        "completion_by_day": completion,
+        "reminders_by_period": reminders,
+    }
+
+
+def compute_cohort_snapshot(days: int | None = None, chunk: int | None = None) -> dict:
+    """Читает таблицы чанками и считает снапшот за последние `days` дней (UTC)."""
+    days = days or settings.COHORT_STATS_DAYS
+    chunk = chunk or settings.COHORT_STATS_CHUNK
+    now = datetime.now(timezone.utc)
+    since = (now - timedelta(days=days - 1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    # SQLite хранит naive UTC — сравниваем с naive границей
+    since_naive = since.replace(tzinfo=None)
+
+    with session() as db:
+        user_ids, goals = _stream_columns(
+            db, User, [User.id, User.goal_ml], [_int64, _int64], chunk=chunk,
+        )
+        l_uids, l_ts, l_amounts = _stream_columns(
+            db, WaterLog, [WaterLog.user_id, WaterLog.ts_utc, WaterLog.amount_ml],
+            [_int64, epoch_seconds, _int64],
+            where=WaterLog.ts_utc >= since_naive, chunk=chunk,
+        )
+        r_uids, r_ts, r_periods = _stream_columns(
+            db, ReminderLog, [ReminderLog.user_id, ReminderLog.ts_utc, ReminderLog.period],
+            [_int64, epoch_seconds, _str],
+            where=ReminderLog.ts_utc >= since_naive, chunk=chunk,
+        )
+
+    order = np.argsort(user_ids)
+    stats = compute_cohort_stats(
+        user_ids=user_ids[order],
+        goals=goals[order],
+        log_uids=l_uids,
+        log_ts=l_ts,
+        log_amounts=l_amounts,
+        rem_uids=r_uids,
+        rem_ts=r_ts,
+        rem_periods=r_periods,
+        since_day=int(since.timestamp()) // SECONDS_PER_DAY,
+        n_days=days,
+        response_window_s=settings.COHORT_REMINDER_WINDOW_MIN * 60,
+    )
+    return {"generated_at": now.isoformat(), "days": days, **stats}
+
+
+def refresh_cohort_snapshot() -> dict:
+    """Пересчитывает и сохраняет снапшот когортной статистики."""
+    started = datetime.now(timezone.utc)
+    payload = compute_cohort_snapshot()
+    with session() as db:
+        db.add(CohortSnapshot(created_utc=started, payload=json.dumps(payload)))
+        # Историю снапшотов держим короткой — дашборду нужен только последний
+        db.exec(delete(CohortSnapshot).where(CohortSnapshot.created_utc < started - timedelta(days=7)))
+        db.commit()
+    elapsed = (datetime.now(timezone.utc) - started).total_seconds()
+    logger.info(f"Когортная статистика пересчитана за {elapsed:.2f} с ({payload['users']} пользователей)")
+    return payload
+
+
+async def run_cohort_job():
+    """Обёртка для AsyncIOScheduler: синхронный расчёт уходит в отдельный поток."""
+    try:
+        await asyncio.to_thread(refresh_cohort_snapshot)
+    except Exception as e:
+        logger.error(f"Ошибка пересчёта когортной статистики: {e}")
+
+
+def latest_cohort_snapshot(db) -> CohortSnapshot | None:
+    return db.exec(select(CohortSnapshot).order_by(CohortSnapshot.id.desc())).first()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    from src.shared.db import init_db
+
+    init_db()
+    print(json.dumps(refresh_cohort_snapshot(), ensure_ascii=False, indent=2))
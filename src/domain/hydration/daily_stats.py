@@ -0,0 +1,89 @@
+"""
+Дневные итоги и запись в журнал — общие для API и бота.
+
+Закрытые дни считаются один раз и берутся из кэша; текущий день всегда
+пересчитывается одним обращением к репозиторию и сверяется с закэшированным ответом, поэтому
+записи, сделанные другим процессом (бот ↔ API), видны сразу. Запись в журнал
+или смена цели в своём процессе сбрасывает готовые ответы через invalidate_user().
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from src.shared.models import User
+from src.domain.hydration.service import HydrationService as HS
+from src.domain.hydration.analytics import analytics_cache, get_user_analytics
+from src.domain.hydration.repository import HydrationRepository
+from src.domain.hydration.stats_cache import get_stats_cache
+
+
+def get_or_create_user(repo: HydrationRepository, tg_id: int, bot_id: int | None = None) -> User:
+    """Пользователь по Telegram id; создаётся при первом обращении. Запоминает бота пользователя."""
+    return repo.get_or_create_user(tg_id, bot_id)
+
+
+def today_total(repo: HydrationRepository, u: User) -> int:
+    """Сколько выпито за сегодня (локальный день пользователя)."""
+    start, end = HS.local_bounds(u)
+    return repo.range_total(u.id, HS.to_utc(start), HS.to_utc(end))
+
+
+def add_log(repo: HydrationRepository, u: User, amount_ml: int, source: str) -> None:
+    """Добавляет запись в журнал и сбрасывает кэши пользователя."""
+    repo.append_log(u.id, datetime.utcnow().replace(tzinfo=timezone.utc), amount_ml, source)
+    invalidate_user(u.id)
+
+
+def reset_today(repo: HydrationRepository, u: User) -> None:
+    """Удаляет все записи за сегодня (в локальном дне пользователя)."""
+    start, end = HS.local_bounds(u)
+    repo.delete_logs(u.id, HS.to_utc(start), HS.to_utc(end))
+    invalidate_user(u.id)
+
+
+def set_goal(repo: HydrationRepository, u: User, goal_ml: int) -> None:
+    """Меняет дневную цель и сбрасывает кэши пользователя."""
+    repo.update_user(u, goal_ml=goal_ml)
+    invalidate_user(u.id)
+
+
+def days_stats(repo: HydrationRepository, u: User, days: int) -> dict:
+    """Итоги по дням за последние `days` дней (включая сегодня) и цель пользователя."""
+    cache = get_stats_cache()
+    now = HS.user_now(u)
+    today_iso = now.date().isoformat()
+    cached = cache.get_window(u.id, days, today_iso)
+    if cached is not None:
+        if cached["goal_ml"] == u.goal_ml and cached["days"][-1]["ml"] == today_total(repo, u):
+            return cached
+
+    start_local = (now - timedelta(days=days - 1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    dates = [(start_local + timedelta(days=i)).date().isoformat() for i in range(days)]
+
+    # Из журнала читаем только начиная с первого закрытого дня, которого нет в кэше
+    closed = cache.get_closed_days(u.id, dates[:-1])
+    missing = [i for i, d in enumerate(dates[:-1]) if d not in closed]
+    first = missing[0] if missing else days - 1
+    totals = dict(zip(
+        dates[first:],
+        repo.daily_totals(u.id, HS.to_utc(start_local + timedelta(days=first)), days - first),
+    ))
+
+    fresh = {dates[i]: totals.get(dates[i], 0) for i in missing}
+    cache.set_closed_days(u.id, fresh)
+    closed.update(fresh)
+    closed[today_iso] = totals.get(today_iso, 0)
+
+    result = {"days": [{"date": d, "ml": closed[d]} for d in dates], "goal_ml": u.goal_ml}
+    cache.set_window(u.id, days, today_iso, result)
+    return result
+
+
+def user_analytics(repo: HydrationRepository, u: User) -> dict:
+    """Аналитика за всю историю; кэш сверяется с сегодняшним итогом."""
+    return get_user_analytics(repo, u, today_total(repo, u))
+
+
+def invalidate_user(user_id: int) -> None:
+    """Сбрасывает кэши пользователя после записи в журнал или смены цели."""
+    get_stats_cache().invalidate_user(user_id)
+    analytics_cache.invalidate(user_id)
@@ -0,0 +1,154 @@
+"""
+Профили потребления воды по часам для адаптивных напоминаний.
+
+Для каждого пользователя хранится кольцевой буфер последних N дней × 24 часа
+(float32, ~2.7 КБ на пользователя при N=28). Буфер пополняется инкрементально —
+из репозитория читаются только записи журнала с id больше последнего обработанного.
+По профилю оценивается, доберёт ли пользователь порог периода к дедлайну
+без напоминания.
+"""
+
+import threading
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from src.domain.hydration.analytics import SECONDS_PER_DAY
+
+
+class _Profile:
+    __slots__ = ("grid", "row_day", "nudged", "first_day")
+
+    def __init__(self, days: int, first_day: int):
+        self.grid = np.zeros((days, 24), dtype=np.float32)  # выпито по часам в каждом дне буфера
+        self.row_day = np.full(days, -1, dtype=np.int64)  # номер дня (от epoch) для каждой строки
+        self.nudged = np.zeros(days, dtype=np.uint8)  # битовая маска периодов с напоминанием в этот день
+        self.first_day = first_day  # первый день, за который видели записи
+
+    def claim_row(self, d: int) -> int:
+        """Строка буфера под день `d`; занятая более старым днём строка обнуляется."""
+        r = d % self.row_day.size
+        if d > self.row_day[r]:
+            self.grid[r] = 0
+            self.nudged[r] = 0
+            self.row_day[r] = d
+        return r
+
+
+class IntakeProfileStore:
+    """
+    Хранилище профилей потребления по часам с инкрементальным обновлением из журнала.
+
+    Дни, когда пользователю отправлялось напоминание периода, отмечаются по
+    журналу напоминаний: выпитое после нашего напоминания — не «сам доберёт»,
+    такие дни не участвуют в прогнозе для этого периода.
+    """
+
+    def __init__(self, days: int = 28, chunk: int = 5000, periods: tuple[str, ...] = ()):
+        self.days = days
+        self.chunk = chunk
+        self.last_log_id = 0
+        self.last_reminder_id = 0
+        self._period_bits = {p: 1 << i for i, p in enumerate(periods)}
+        self._profiles: dict[int, _Profile] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._profiles)
+
+    def refresh(self, repo, utc_offset_s: int = 0) -> int:
+        """
+        Дочитывает новые записи журналов воды и напоминаний в профили.
+
+        Смещение таймзоны берётся текущее для всей порции: для прогноза по
+        часам ошибка в час на границе перехода на летнее время несущественна.
+        Возвращает количество обработанных записей.
+        """
+        processed = 0
+        # Записи старше буфера всё равно не попадут в профиль (важно для первого прогрева)
+        since = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=self.days)
+        with self._lock:
+            while True:
+                ids, uids, ts, amounts = repo.logs_after(self.last_log_id, since, self.chunk)
+                if not ids.size:
+                    break
+                self.ingest(uids, ts, amounts.astype(np.float32), utc_offset_s)
+                self.last_log_id = int(ids[-1])
+                processed += int(ids.size)
+                if ids.size < self.chunk:
+                    break
+            while self._period_bits:
+                ids, uids, ts, periods = repo.reminders_after(self.last_reminder_id, since, self.chunk)
+                if not ids.size:
+                    break
+                self.mark_nudged(uids, ts, periods, utc_offset_s)
+                self.last_reminder_id = int(ids[-1])
+                if ids.size < self.chunk:
+                    break
+        return processed
+
+    def mark_nudged(self, uids: np.ndarray, ts: np.ndarray, periods: list[str], utc_offset_s: int = 0):
+        """Отмечает дни, когда пользователю отправлялось напоминание периода (секунды epoch UTC)."""
+        days = ((ts + utc_offset_s) // SECONDS_PER_DAY).tolist()
+        for uid, d, period in zip(uids.tolist(), days, periods):
+            bit = self._period_bits.get(period)
+            if not bit:
+                continue
+            prof = self._profiles.get(uid)
+            if prof is None:
+                prof = _Profile(self.days, d)
+                self._profiles[uid] = prof
+            prof.first_day = min(prof.first_day, d)
+            r = prof.claim_row(d)
+            if prof.row_day[r] == d:
+                prof.nudged[r] |= bit
+
+    def ingest(self, uids: np.ndarray, ts: np.ndarray, amounts: np.ndarray, utc_offset_s: int = 0):
+        """Добавляет порцию записей (секунды epoch UTC) в профили пользователей."""
+        local = ts + utc_offset_s
+        day = local // SECONDS_PER_DAY
+        hour = (local % SECONDS_PER_DAY) // 3600
+        order = np.argsort(uids, kind="stable")
+        uniq, starts = np.unique(uids[order], return_index=True)
+        bounds = np.append(starts, order.size)
+        for i, uid in enumerate(uniq.tolist()):
+            sel = order[bounds[i]:bounds[i + 1]]
+            self._ingest_user(uid, day[sel], hour[sel], amounts[sel])
+
+    def _ingest_user(self, uid: int, day: np.ndarray, hour: np.ndarray, amount: np.ndarray):
+        prof = self._profiles.get(uid)
+        if prof is None:
+            prof = _Profile(self.days, int(day.min()))
+            self._profiles[uid] = prof
+        prof.first_day = min(prof.first_day, int(day.min()))
+
+        rows = day % self.days
+        for d in np.unique(day).tolist():
+            prof.claim_row(d)
+        keep = day == prof.row_day[rows]
+        np.add.at(prof.grid, (rows[keep], hour[keep]), amount[keep])
+
+    def reach_probability(
+        self, uid: int, today_day: int, from_hour: int, to_hour: int, needed_ml: float, min_days: int,
+        period: str | None = None,
+    ) -> float | None:
+        """
+        Доля прошлых дней, в которые пользователь выпивал не меньше `needed_ml`
+        в интервале часов [from_hour, to_hour). None — если истории недостаточно.
+        Дни без записей считаются днями без приёма воды; дни с напоминанием
+        периода `period` не учитываются ни в числителе, ни в знаменателе.
+        """
+        prof = self._profiles.get(uid)
+        if prof is None:
+            return None
+        observed = min(self.days, today_day - prof.first_day)
+        if observed < min_days:
+            return None
+        past = (prof.row_day < today_day) & (prof.row_day >= today_day - observed)
+        bit = self._period_bits.get(period, 0)
+        nudged = past & ((prof.nudged & bit) != 0)
+        unaided = observed - int(np.count_nonzero(nudged))
+        if unaided < min_days:
+            return None
+        gained = prof.grid[past & ~nudged, from_hour:to_hour].sum(axis=1)
+        return float(np.count_nonzero(gained >= needed_ml)) / unaided
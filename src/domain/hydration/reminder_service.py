@@ -1,19 +1,35 @@
 import asyncio
+import json
 import logging
-from datetime import datetime, timedelta
-from typing import List, Optional
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, List, Optional
 import pytz
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
-from sqlmodel import select, func
-from aiogram import Bot
-
-from src.shared.config import settings
-from src.shared.db import session
-from src.shared.models import User, WaterLog
+from src.shared.config import settings, bot_id_from_token
+from src.shared.db import count_queries
+from src.shared.models import User, ReminderLog, SweepRun
+from src.domain.hydration.repository import HydrationRepository, get_repository
+from src.domain.hydration.intake_profile import IntakeProfileStore
+from src.domain.hydration.sender import MessageSender
 
 logger = logging.getLogger(__name__)
 
+EPOCH_DATE = date(1970, 1, 1)
+
+# Пороги периодов: ниже порога — напоминаем. deadline — час, к которому
+# порог должен быть достигнут (используется для прогноза по профилю).
+PERIOD_TARGETS = {
+    "morning": {"min_ml": 200, "deadline": 11},      # Утро: <200 мл
+    "day": {"goal_share": 0.40, "deadline": 15},     # День: <40% дневной цели
+    "evening": {"goal_share": 0.70, "deadline": 21}, # Вечер: <70% дневной цели
+    "critical": {"goal_share": 0.50, "deadline": 24},# Критическое отставание: <50% цели
+}
+
+# Причины, по которым напоминание не отправлено (ключи отчёта о проверке)
+SKIP_REASONS = ("quiet", "limit", "duplicate", "on_track", "predicted")
+
 
 class HydrationReminderService:
     """
@@ -26,10 +42,24 @@ class HydrationReminderService:
     - День (12-14): если выпито <40% дневной цели
     - Вечер (18-20): если выпито <70-80% дневной цели
     - Критическое отставание (21:00): если далеко до цели
+    - Повторная проверка периода не дублирует уже отправленное напоминание
+    - Пользователь, который по своему профилю потребления и так доберёт
+      порог периода к дедлайну, напоминание не получает
     """
     
-    def __init__(self, bot: Bot):
-        self.bot = bot
+    def __init__(
+        self,
+        bots: Optional[MessageSender] = None,
+        repo: Optional[HydrationRepository] = None,
+        reply_markup: Optional[Callable[[User], Any]] = None,
+    ):
+        # Пул ботов: напоминание уходит через бота, с которым общается пользователь.
+        # Без пула сервис годится только для симуляции (simulate).
+        self.bots = bots
+        # Клавиатура под напоминанием (строит слой бота, например кнопки быстрой записи)
+        self.reply_markup = reply_markup
+        # Доступ к данным — только через репозиторий (бэкенд задаёт HYDRATION_REPOSITORY)
+        self.repo = repo or get_repository()
         self.scheduler = AsyncIOScheduler()
         self.default_tz = pytz.timezone(settings.DEFAULT_TZ)
         
@@ -46,6 +76,15 @@ class HydrationReminderService:
         
         # Счетчик уведомлений для каждого пользователя
         self.daily_notifications = {}
+        # Периоды, по которым пользователю уже отправлено напоминание сегодня
+        self.period_notified = set()
+        
+        # Профили потребления по часам для адаптивного подавления напоминаний
+        self.profiles = IntakeProfileStore(days=settings.REMINDER_PROFILE_DAYS, periods=tuple(PERIOD_TARGETS))
+        
+        # Текущая проверка и флаг остановки (для корректного завершения)
+        self._current_sweep: Optional[asyncio.Task] = None
+        self._stopping = False
         
     async def start(self):
         """Запускает планировщик напоминаний."""
@@ -69,90 +108,319 @@ class HydrationReminderService:
             replace_existing=True
         )
         
+        self._stopping = False
+        self._restore_daily_counters()
+        self._resume_interrupted_sweeps()
+        
         self.scheduler.start()
         logger.info("Планировщик напоминаний запущен")
     
     async def stop(self):
-        """Останавливает планировщик."""
+        """
+        Останавливает планировщик. Текущая проверка дорабатывает начатый чанк
+        (включая отправку сообщений) в пределах REMINDER_SHUTDOWN_DEADLINE_SEC;
+        остаток продолжится с чекпоинта после перезапуска.
+        """
+        self._stopping = True
+        task = self._current_sweep
+        if task and not task.done() and task is not asyncio.current_task():
+            try:
+                await asyncio.wait_for(asyncio.shield(task), timeout=settings.REMINDER_SHUTDOWN_DEADLINE_SEC)
+            except asyncio.TimeoutError:
+                logger.warning("Проверка напоминаний не завершила чанк вовремя — прерываем")
+                task.cancel()
+                # Даём прерванной проверке сохранить уже отправленное
+                await asyncio.gather(task, return_exceptions=True)
         if self.scheduler.running:
-            self.scheduler.shutdown()
+            self.scheduler.shutdown(wait=False)
             logger.info("Планировщик напоминаний остановлен")
     
     async def _reset_daily_counters(self):
         """Сбрасывает счетчики ежедневных уведомлений."""
         self.daily_notifications.clear()
+        self.period_notified.clear()
         logger.info("Счетчики ежедневных уведомлений сброшены")
     
-    async def check_and_notify(self, hour: int, period: str):
+    async def check_and_notify(self, hour: int, period: str) -> dict:
         """
         Проверяет всех пользователей и отправляет уведомления при необходимости.
         
+        Пользователи обрабатываются чанками по id; после каждого чанка курсор
+        и счётчики фиксируются в SweepRun вместе с журналом отправок, поэтому
+        прерванная проверка продолжается с места остановки.
+        
         Args:
             hour: Час проверки
             period: Период дня (morning, day, evening, critical)
+            
+        Returns:
+            Отчёт о проверке: сколько отправлено и сколько сообщений сэкономлено
         """
         logger.info(f"Проверка напоминаний для часа {hour} ({period})")
+        report = {"users": 0, "sent": 0, "failed": 0, **{r: 0 for r in SKIP_REASONS}}
+        self._current_sweep = asyncio.current_task()
         
         try:
-            with session() as db:
-                # Получаем всех пользователей
-                users = db.exec(select(User)).all()
+            now = datetime.now(self.default_tz)
+            run = self.repo.get_or_create_sweep_run(now.date().isoformat(), hour, period)
+            if run.status != "running":
+                logger.info(f"Проверка {hour}:00 ({period}) за {run.local_date} уже выполнена")
+                return json.loads(run.report)
+            cursor = run.last_user_id
+            if cursor:
+                report.update(json.loads(run.report))
+                logger.info(f"Продолжаем проверку {run.id} с пользователя id>{cursor}")
+            
+            self._refresh_profiles(now)
+            
+            while not self._stopping:
+                users = self.repo.users_after(cursor, settings.REMINDER_SWEEP_CHUNK)
+                if not users:
+                    run.status = "done"
+                    break
+                before = dict(report)
+                sent: list[ReminderLog] = []
+                try:
+                    await self._process_chunk(users, hour, period, now, report, sent)
+                except asyncio.CancelledError:
+                    # Прерваны по дедлайну остановки: уже ушедшие сообщения фиксируем в журнале,
+                    # курсор не двигаем — после рестарта чанк перепроверится, а получившие
+                    # напоминание отсеются как дубли (счётчики восстанавливаются из журнала)
+                    self._save_checkpoint(run, cursor, before, sent)
+                    raise
+                cursor = users[-1].id
                 
-                for user in users:
-                    try:
-                        await self._check_user_hydration(db, user, hour, period)
-                    except Exception as e:
-                        logger.error(f"Ошибка при проверке пользователя {user.id}: {e}")
+                # Чекпоинт: курсор и счётчики сохраняются вместе с журналом отправок чанка
+                self._save_checkpoint(run, cursor, report, sent)
+            
+            self._save_checkpoint(run, cursor, report)
                         
         except Exception as e:
             logger.error(f"Ошибка при проверке напоминаний: {e}")
+        finally:
+            self._current_sweep = None
+        
+        avoided = report["predicted"] + report["duplicate"]
+        logger.info(
+            f"Напоминания {hour}:00 ({period}): отправлено {report['sent']}, "
+            f"сэкономлено {avoided} (прогноз {report['predicted']}, дубли {report['duplicate']})"
+        )
+        return report
+    
+    async def _process_chunk(
+        self, users: list, hour: int, period: str, now: datetime, report: dict, sent: list[ReminderLog]
+    ):
+        """Оценивает чанк пользователей (одна выборка итогов) и отправляет напоминания."""
+        totals = self._get_today_totals(now, [u.id for u in users])
+        report["users"] += len(users)
+        outbox = self._evaluate_chunk(users, totals, hour, period, now, report)
+        await self._dispatch(outbox, period, now, report, sent)
+    
+    def _evaluate_chunk(
+        self, users: list, totals: dict[int, int], hour: int, period: str, now: datetime, report: dict,
+        counters: Optional[tuple[dict, set]] = None,
+    ) -> list:
+        """
+        Пакетная оценка чанка: возвращает (user, stats) к отправке, причины пропуска — в report.
+        `counters` — (счётчики за день, отмеченные периоды); по умолчанию — счётчики сервиса.
+        """
+        outbox = []
+        for user in users:
+            try:
+                stats = self._build_stats(user, totals.get(user.id, 0), now)
+                decision = self._evaluate_user(user, stats, hour, period, now, counters)
+                if decision != "send":
+                    report[decision] += 1
+                    continue
+                outbox.append((user, stats))
+            except Exception as e:
+                logger.error(f"Ошибка при проверке пользователя {user.id}: {e}")
+        return outbox
+    
+    def _save_checkpoint(self, run: SweepRun, cursor: int, report: dict, sent: list[ReminderLog] = ()):
+        run.last_user_id = cursor
+        run.report = json.dumps(report)
+        self.repo.save_sweep_run(run, sent)
+    
+    def _period_window_end(self, hour: int, period: str) -> int:
+        """Час, до которого проверку ещё имеет смысл продолжать после рестарта."""
+        next_checks = [h for h, _ in self.check_times if h > hour]
+        candidates = [22]  # начало окна тишины
+        if next_checks:
+            candidates.append(min(next_checks))
+        if period in PERIOD_TARGETS:
+            candidates.append(PERIOD_TARGETS[period]["deadline"])
+        return min(candidates)
     
-    async def _check_user_hydration(self, db, user: User, hour: int, period: str):
-        """Проверяет гидратацию конкретного пользователя."""
-        user_tz = self.default_tz  # Можно расширить для поддержки индивидуальных таймзон
+    def _resume_interrupted_sweeps(self):
+        """Возобновляет незавершённые проверки, если их окно ещё не прошло; остальные закрывает."""
+        now = datetime.now(self.default_tz)
+        today = now.date().isoformat()
+        try:
+            for run in self.repo.running_sweep_runs():
+                if run.local_date == today and run.hour <= now.hour < self._period_window_end(run.hour, run.period):
+                    logger.info(f"Возобновляем проверку {run.hour}:00 ({run.period}) с id>{run.last_user_id}")
+                    self.scheduler.add_job(
+                        self.check_and_notify,
+                        args=[run.hour, run.period],
+                        id=f"hydration_resume_{run.id}",
+                        next_run_time=now,
+                        replace_existing=True,
+                    )
+                else:
+                    run.status = "expired"
+                    self.repo.save_sweep_run(run)
+        except Exception as e:
+            logger.error(f"Ошибка при возобновлении проверок: {e}")
+    
+    def _restore_daily_counters(self):
+        """Восстанавливает сегодняшние счётчики уведомлений из журнала отправок."""
+        now = datetime.now(self.default_tz)
+        start_utc, end_utc = self._day_bounds_utc(now)
+        try:
+            counts, notified = self._load_counters(now, start_utc, end_utc)
+        except Exception as e:
+            logger.error(f"Ошибка восстановления счётчиков уведомлений: {e}")
+            return
+        for user_key, n in counts.items():
+            self.daily_notifications[user_key] = self.daily_notifications.get(user_key, 0) + n
+        self.period_notified.update(notified)
+    
+    def _load_counters(self, now: datetime, start_utc: datetime, end_utc: datetime) -> tuple[dict, set]:
+        """Счётчики уведомлений дня `now` по журналу отправок за [start_utc, end_utc)."""
+        counts, notified = {}, set()
+        for user_id, period in self.repo.reminder_periods_between(start_utc, end_utc):
+            user_key = self._user_key(user_id, now)
+            counts[user_key] = counts.get(user_key, 0) + 1
+            notified.add(self._period_key(user_id, period, now))
+        return counts, notified
+    
+    async def _dispatch(self, outbox: list, period: str, now: datetime, report: dict, sent: list[ReminderLog]):
+        """
+        Отправляет пачку напоминаний параллельно: каждое идёт через бота
+        пользователя, темп ограничивает лимитер этого бота в пуле.
+        Записи ReminderLog добавляются в `sent` по мере отправки — так при отмене
+        проверки уже ушедшие сообщения не теряются; сохраняет их вызывающий код.
+        """
+        async def deliver(user: User, stats: dict):
+            ok = await self._send_reminder(user, stats, period)
+            if ok:
+                # Журнал отправок нужен для когортной статистики (реакция на напоминания)
+                sent.append(ReminderLog(user_id=user.id, ts_utc=datetime.now(pytz.UTC), period=period))
+                report["sent"] += 1
+            else:
+                report["failed"] += 1
+            self._mark_notified(user, period, now, delivered=ok)
+        
+        await asyncio.gather(*(deliver(user, stats) for user, stats in outbox))
+    
+    def _refresh_profiles(self, now: datetime):
+        """Дочитывает новые записи журнала в профили потребления."""
+        if not settings.REMINDER_ADAPTIVE:
+            return
+        offset = now.utcoffset()
+        self.profiles.refresh(self.repo, int(offset.total_seconds()) if offset else 0)
+    
+    def _get_today_totals(
+        self, now: datetime, user_ids: list[int], until_utc: Optional[datetime] = None
+    ) -> dict[int, int]:
+        """Суммы выпитого за день `now` по пользователям чанка (одна выборка на чанк)."""
+        start_utc, end_utc = self._day_bounds_utc(now)
+        if until_utc is not None:
+            end_utc = min(end_utc, until_utc)
+        return self.repo.totals_for_users(user_ids, start_utc, end_utc)
+    
+    def _evaluate_user(
+        self, user: User, stats: dict, hour: int, period: str, now: datetime,
+        counters: Optional[tuple[dict, set]] = None,
+    ) -> str:
+        """
+        Решает, что делать с пользователем в этой проверке.
+        
+        Returns:
+            "send" или причина пропуска из SKIP_REASONS
+        """
+        daily_notifications, period_notified = counters or (self.daily_notifications, self.period_notified)
         
         # Проверяем окно тишины (22:00 - 07:00)
         if self._is_quiet_hours(hour):
-            return
+            return "quiet"
         
         # Проверяем лимит уведомлений (максимум 4 в день)
-        user_key = f"{user.id}_{datetime.now().date()}"
-        if self.daily_notifications.get(user_key, 0) >= 4:
-            return
+        if daily_notifications.get(self._user_key(user.id, now), 0) >= 4:
+            return "limit"
         
-        # Получаем статистику за сегодня
-        today_stats = self._get_today_hydration_stats(db, user, user_tz)
+        # Повторная проверка периода (10:00, 14:00, 20:00) — не дублируем уже отправленное
+        if self._period_key(user.id, period, now) in period_notified:
+            return "duplicate"
         
-        # Проверяем, нужно ли напоминание
-        should_notify = self._should_send_reminder(user, today_stats, period)
+        if not self._should_send_reminder(user, stats, period):
+            return "on_track"
         
-        if should_notify:
-            await self._send_reminder(user, today_stats, period)
-            self.daily_notifications[user_key] = self.daily_notifications.get(user_key, 0) + 1
+        if self._will_reach_target(user, stats, hour, period, now):
+            return "predicted"
+        
+        return "send"
+    
+    def _will_reach_target(self, user: User, stats: dict, hour: int, period: str, now: datetime) -> bool:
+        """
+        Прогноз по профилю: доберёт ли пользователь порог периода к дедлайну без напоминания.
+        Дни, когда по этому периоду уже напоминали, в прогнозе не участвуют.
+        """
+        if not settings.REMINDER_ADAPTIVE:
+            return False
+        target = PERIOD_TARGETS.get(period)
+        if not target:
+            return False
+        needed = self._period_target_ml(stats["goal_ml"], period) - stats["total_ml"]
+        probability = self.profiles.reach_probability(
+            user.id,
+            today_day=(now.date() - EPOCH_DATE).days,
+            from_hour=hour,
+            to_hour=target["deadline"],
+            needed_ml=needed,
+            min_days=settings.REMINDER_PREDICT_MIN_DAYS,
+            period=period,
+        )
+        return probability is not None and probability >= settings.REMINDER_PREDICT_CONFIDENCE
+    
+    def _user_key(self, user_id: int, now: datetime) -> str:
+        return f"{user_id}_{now.date()}"
+    
+    def _period_key(self, user_id: int, period: str, now: datetime) -> str:
+        return f"{user_id}_{now.date()}_{period}"
+    
+    def _mark_notified(self, user: User, period: str, now: datetime, delivered: bool = True):
+        """
+        Учитывает попытку в дневном лимите; период считается закрытым только
+        при успешной отправке — после сбоя повторная проверка периода попробует снова.
+        """
+        user_key = self._user_key(user.id, now)
+        self.daily_notifications[user_key] = self.daily_notifications.get(user_key, 0) + 1
+        if delivered:
+            self.period_notified.add(self._period_key(user.id, period, now))
     
     def _is_quiet_hours(self, hour: int) -> bool:
         """Проверяет, находится ли час в окне тишины."""
         return hour >= 22 or hour < 7
     
-    def _get_today_hydration_stats(self, db, user: User, user_tz) -> dict:
-        """Получает статистику гидратации пользователя за сегодня."""
-        now = datetime.now(user_tz)
+    def _day_bounds_utc(self, now: datetime) -> tuple[datetime, datetime]:
+        """Границы локального дня `now` в UTC для запросов к журналу."""
         start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
         end_of_day = now.replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        # Конвертируем в UTC для запроса к БД
-        start_utc = start_of_day.astimezone(pytz.UTC)
-        end_utc = end_of_day.astimezone(pytz.UTC)
+        return start_of_day.astimezone(pytz.UTC), end_of_day.astimezone(pytz.UTC)
+    
+    def _get_today_hydration_stats(self, user: User, user_tz) -> dict:
+        """Получает статистику гидратации пользователя за сегодня."""
+        now = datetime.now(user_tz)
+        start_utc, end_utc = self._day_bounds_utc(now)
         
         # Получаем общее количество выпитой воды за день
-        result = db.exec(
-            select(func.sum(WaterLog.amount_ml))
-            .where(WaterLog.user_id == user.id)
-            .where(WaterLog.ts_utc >= start_utc)
-            .where(WaterLog.ts_utc <= end_utc)
-        ).first()
-        
-        total_ml = result or 0
+        total = self.repo.range_total(user.id, start_utc, end_utc)
+        
+        return self._build_stats(user, total, now)
+    
+    def _build_stats(self, user: User, total_ml: int, now: datetime) -> dict:
         progress_percent = (total_ml / user.goal_ml) * 100 if user.goal_ml > 0 else 0
         
         return {
@@ -163,43 +431,38 @@ class HydrationReminderService:
             "current_hour": now.hour
         }
     
+    def _period_target_ml(self, goal_ml: int, period: str) -> float:
+        """Порог периода в мл: ниже него пользователю нужно напоминание."""
+        target = PERIOD_TARGETS.get(period)
+        if not target:
+            return 0
+        if "min_ml" in target:
+            return target["min_ml"]
+        return goal_ml * target["goal_share"]
+    
     def _should_send_reminder(self, user: User, stats: dict, period: str) -> bool:
         """Определяет, нужно ли отправить напоминание."""
-        total_ml = stats["total_ml"]
-        goal_ml = stats["goal_ml"]
-        progress_percent = stats["progress_percent"]
-        
-        if period == "morning":
-            # Утро: напомнить, если выпито <200 мл
-            return total_ml < 200
-            
-        elif period == "day":
-            # День: напомнить, если выпито <40% дневной цели
-            return progress_percent < 40
-            
-        elif period == "evening":
-            # Вечер: напомнить, если выпито <70% дневной цели
-            return progress_percent < 70
-            
-        elif period == "critical":
-            # Критическое отставание: если выпито <50% дневной цели
-            return progress_percent < 50
-            
-        return False
+        if period not in PERIOD_TARGETS:
+            return False
+        return stats["total_ml"] < self._period_target_ml(stats["goal_ml"], period)
     
-    async def _send_reminder(self, user: User, stats: dict, period: str):
-        """Отправляет напоминание пользователю."""
+    async def _send_reminder(self, user: User, stats: dict, period: str) -> bool:
+        """Отправляет напоминание пользователю. Возвращает True при успешной отправке."""
         message = self._generate_reminder_message(user, stats, period)
         
         try:
-            await self.bot.send_message(
+            await self.bots.send_message(
+                user.bot_id,
                 chat_id=user.tg_id,
                 text=message,
-                parse_mode="HTML"
+                parse_mode="HTML",
+                reply_markup=self.reply_markup(user) if self.reply_markup else None,
             )
             logger.info(f"Напоминание отправлено пользователю {user.id} ({period})")
+            return True
         except Exception as e:
             logger.error(f"Ошибка отправки напоминания пользователю {user.id}: {e}")
+            return False
     
     def _generate_reminder_message(self, user: User, stats: dict, period: str) -> str:
         """Генерирует текст напоминания."""
@@ -255,21 +518,92 @@ class HydrationReminderService:
         
         return message
     
+    def simulate(self, hour: int, period: Optional[str] = None, on_date: Optional[date] = None) -> dict:
+        """
+        Пробный прогон проверки без отправки сообщений и без изменения счётчиков.
+        
+        Пользователи проходят тот же пакетный путь оценки, что и в check_and_notify.
+        Для прошедших часов учитываются только записи до часа проверки. Лимит и
+        дубли считаются по журналу отправок до часа проверки — в локальных
+        счётчиках, счётчики сервиса не меняются.
+        
+        Args:
+            hour: Час проверки (локальное время DEFAULT_TZ)
+            period: Период; если не задан — все периоды из PERIOD_TARGETS
+            on_date: Дата (по умолчанию сегодня)
+            
+        Returns:
+            Счётчики решений по периодам, оценку времени рассылки при лимитах
+            ботов и стоимость запросов к БД
+        """
+        real_now = datetime.now(self.default_tz)
+        on_date = on_date or real_now.date()
+        now = self.default_tz.localize(datetime(on_date.year, on_date.month, on_date.day, hour))
+        until_utc = min(now, real_now).astimezone(pytz.UTC)
+        periods = [period] if period else list(PERIOD_TARGETS)
+        
+        tokens = settings.bot_tokens()
+        default_bot = bot_id_from_token(tokens[0])
+        known_bots = {bot_id_from_token(t) for t in tokens}
+        rate = self.bots.rate_per_sec if self.bots else settings.BOT_SEND_RATE_PER_SEC
+        
+        reports = {p: {"users": 0, "send": 0, **{r: 0 for r in SKIP_REASONS}} for p in periods}
+        per_bot = {p: {} for p in periods}
+        started = time.perf_counter()
+        
+        with count_queries() as cost:
+            day_start_utc, _ = self._day_bounds_utc(now)
+            counters = self._load_counters(now, day_start_utc, until_utc)
+            self._refresh_profiles(real_now)
+            cursor = 0
+            while True:
+                users = self.repo.users_after(cursor, settings.REMINDER_SWEEP_CHUNK)
+                if not users:
+                    break
+                cursor = users[-1].id
+                totals = self._get_today_totals(now, [u.id for u in users], until_utc)
+                for p in periods:
+                    reports[p]["users"] += len(users)
+                    outbox = self._evaluate_chunk(users, totals, hour, p, now, reports[p], counters)
+                    reports[p]["send"] += len(outbox)
+                    for user, _ in outbox:
+                        bot_id = user.bot_id if user.bot_id in known_bots else default_bot
+                        per_bot[p][bot_id] = per_bot[p].get(bot_id, 0) + 1
+        
+        result = {}
+        for p in periods:
+            # Боты шлют параллельно, каждый со своим лимитом — время определяет самый загруженный
+            busiest = max(per_bot[p].values(), default=0)
+            result[p] = {
+                **reports[p],
+                "by_bot": {str(k): v for k, v in per_bot[p].items()},
+                "estimated_dispatch_s": round(busiest / rate, 2) if rate > 0 else None,
+            }
+        return {
+            "date": on_date.isoformat(),
+            "hour": hour,
+            "bots": len(known_bots),
+            "rate_per_bot": rate,
+            "periods": result,
+            "queries": cost["queries"],
+            "db_time_ms": round(cost["db_time_ms"], 1),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+    
     async def get_user_stats(self, user_id: int) -> Optional[dict]:
         """Получает статистику пользователя за сегодня (для отладки)."""
         try:
-            with session() as db:
-                user = db.get(User, user_id)
-                if not user:
-                    return None
-                
-                stats = self._get_today_hydration_stats(db, user, self.default_tz)
-                return {
-                    "user_id": user_id,
-                    "goal_ml": user.goal_ml,
-                    "default_glass_ml": user.default_glass_ml,
-                    **stats
-                }
+            user = self.repo.get_user_by_id(user_id)
+            if not user:
+                return None
+            
+            stats = self._get_today_hydration_stats(user, self.default_tz)
+            return {
+                "user_id": user_id,
+                "goal_ml": user.goal_ml,
+                "default_glass_ml": user.default_glass_ml,
+                **stats
+            }
         except Exception as e:
             logger.error(f"Ошибка получения статистики пользователя {user_id}: {e}")
             return None
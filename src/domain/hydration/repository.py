@@ -0,0 +1,532 @@
+"""
+Репозиторий данных гидратации.
+
+HydrationRepository — интерфейс доступа к пользователям, журналу воды и
+служебным таблицам напоминаний. Обработчики API, бот и сервис напоминаний
+зависят только от него; реализация выбирается настройкой HYDRATION_REPOSITORY:
+
+- "sql" — SqlHydrationRepository поверх SQLModel/engine из src.shared.db;
+- "memory" — InMemoryHydrationRepository: журнал каждого пользователя хранится
+  компактными отсортированными массивами (время в мкс, объём) с префиксными
+  суммами, суммы за интервал считаются бинарным поиском. Годится для бенчмарков
+  доменной логики и быстрых тестов; данные живут только в процессе.
+
+Интервалы времени везде полуоткрытые: [start_utc, end_utc).
+"""
+
+import threading
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlmodel import Session, select, delete, func
+
+from src.shared.config import settings
+from src.shared.db import engine as default_engine
+from src.shared.models import User, WaterLog, ReminderLog, SweepRun
+from src.domain.hydration.analytics import epoch_seconds
+
+_DAY_US = 86400 * 1_000_000
+
+
+class HydrationRepository(ABC):
+    # --- Пользователи ---
+
+    @abstractmethod
+    def get_user(self, tg_id: int) -> User | None:
+        """Пользователь по Telegram id."""
+
+    @abstractmethod
+    def get_user_by_id(self, user_id: int) -> User | None:
+        ...
+
+    @abstractmethod
+    def get_or_create_user(self, tg_id: int, bot_id: int | None = None) -> User:
+        """Пользователь по Telegram id; создаётся при первом обращении, запоминает бота."""
+
+    @abstractmethod
+    def update_user(self, user: User, **fields) -> User:
+        ...
+
+    @abstractmethod
+    def users_after(self, cursor: int, limit: int) -> list[User]:
+        """Следующая порция пользователей с id > cursor по возрастанию id (для проверок)."""
+
+    # --- Журнал воды ---
+
+    @abstractmethod
+    def append_log(self, user_id: int, ts_utc: datetime, amount_ml: int, source: str) -> None:
+        ...
+
+    @abstractmethod
+    def delete_logs(self, user_id: int, start_utc: datetime, end_utc: datetime) -> None:
+        ...
+
+    @abstractmethod
+    def range_total(self, user_id: int, start_utc: datetime, end_utc: datetime) -> int:
+        """Сумма выпитого за интервал."""
+
+    @abstractmethod
+    def daily_totals(self, user_id: int, start_utc: datetime, days: int) -> list[int]:
+        """Суммы за `days` подряд идущих суток, начиная с `start_utc`."""
+
+    @abstractmethod
+    def totals_for_users(self, user_ids: list[int], start_utc: datetime, end_utc: datetime) -> dict[int, int]:
+        """Суммы за интервал по набору пользователей (пользователи без записей не попадают)."""
+
+    @abstractmethod
+    def user_log_arrays(self, user_id: int) -> tuple[np.ndarray, np.ndarray]:
+        """Вся история пользователя: (секунды epoch UTC, мл) в виде массивов int64."""
+
+    @abstractmethod
+    def logs_after(
+        self, log_id: int, since_utc: datetime, limit: int
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Новые записи журнала с id > log_id не старше since_utc: (id, user_id, секунды epoch, мл)."""
+
+    # --- Напоминания ---
+
+    @abstractmethod
+    def reminder_periods_between(self, start_utc: datetime, end_utc: datetime) -> list[tuple[int, str]]:
+        """(user_id, period) отправленных за интервал напоминаний."""
+
+    @abstractmethod
+    def reminders_after(
+        self, reminder_id: int, since_utc: datetime, limit: int
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, list[str]]:
+        """Новые записи журнала напоминаний с id > reminder_id не старше since_utc: (id, user_id, секунды epoch, период)."""
+
+    @abstractmethod
+    def get_or_create_sweep_run(self, local_date: str, hour: int, period: str) -> SweepRun:
+        ...
+
+    @abstractmethod
+    def running_sweep_runs(self) -> list[SweepRun]:
+        ...
+
+    @abstractmethod
+    def save_sweep_run(self, run: SweepRun, reminders: list[ReminderLog] = ()) -> None:
+        """Сохраняет прогон вместе с журналом отправок чанка (атомарно)."""
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class SqlHydrationRepository(HydrationRepository):
+    """Реализация поверх SQLModel; каждая операция — короткая сессия."""
+
+    def __init__(self, engine=None):
+        self.engine = engine or default_engine
+
+    def _session(self) -> Session:
+        # Объекты используются после закрытия сессии — не сбрасываем их при commit
+        return Session(self.engine, expire_on_commit=False)
+
+    def get_user(self, tg_id):
+        with self._session() as s:
+            return s.exec(select(User).where(User.tg_id == tg_id)).first()
+
+    def get_user_by_id(self, user_id):
+        with self._session() as s:
+            return s.get(User, user_id)
+
+    def get_or_create_user(self, tg_id, bot_id=None):
+        with self._session() as s:
+            u = s.exec(select(User).where(User.tg_id == tg_id)).first()
+            if not u:
+                u = User(tg_id=tg_id, bot_id=bot_id)
+            elif bot_id and u.bot_id != bot_id:
+                u.bot_id = bot_id
+            else:
+                return u
+            s.add(u)
+            s.commit()
+            s.refresh(u)
+            return u
+
+    def update_user(self, user, **fields):
+        with self._session() as s:
+            for k, v in fields.items():
+                setattr(user, k, v)
+            s.add(user)
+            s.commit()
+            return user
+
+    def users_after(self, cursor, limit):
+        with self._session() as s:
+            return s.exec(select(User).where(User.id > cursor).order_by(User.id).limit(limit)).all()
+
+    def append_log(self, user_id, ts_utc, amount_ml, source):
+        with self._session() as s:
+            s.add(WaterLog(user_id=user_id, ts_utc=ts_utc, amount_ml=amount_ml, source=source))
+            s.commit()
+
+    def delete_logs(self, user_id, start_utc, end_utc):
+        with self._session() as s:
+            s.exec(
+                delete(WaterLog).where(
+                    (WaterLog.user_id == user_id)
+                    & (WaterLog.ts_utc >= start_utc)
+                    & (WaterLog.ts_utc < end_utc)
+                )
+            )
+            s.commit()
+
+    def range_total(self, user_id, start_utc, end_utc):
+        with self._session() as s:
+            total = s.exec(
+                select(func.sum(WaterLog.amount_ml)).where(
+                    (WaterLog.user_id == user_id)
+                    & (WaterLog.ts_utc >= start_utc)
+                    & (WaterLog.ts_utc < end_utc)
+                )
+            ).first()
+        return total or 0
+
+    def daily_totals(self, user_id, start_utc, days):
+        end_utc = start_utc + timedelta(days=days)
+        with self._session() as s:
+            rows = s.exec(
+                select(WaterLog.ts_utc, WaterLog.amount_ml).where(
+                    (WaterLog.user_id == user_id)
+                    & (WaterLog.ts_utc >= start_utc)
+                    & (WaterLog.ts_utc < end_utc)
+                )
+            ).all()
+        if not rows:
+            return [0] * days
+        day = (epoch_seconds([r[0] for r in rows]) - int(start_utc.timestamp())) // 86400
+        amounts = np.array([r[1] for r in rows], dtype=np.int64)
+        return np.bincount(day, weights=amounts, minlength=days)[:days].astype(np.int64).tolist()
+
+    def totals_for_users(self, user_ids, start_utc, end_utc):
+        if not user_ids:
+            return {}
+        with self._session() as s:
+            rows = s.exec(
+                select(WaterLog.user_id, func.sum(WaterLog.amount_ml))
+                .where(WaterLog.user_id.in_(user_ids))
+                .where(WaterLog.ts_utc >= start_utc)
+                .where(WaterLog.ts_utc < end_utc)
+                .group_by(WaterLog.user_id)
+            ).all()
+        return {user_id: total or 0 for user_id, total in rows}
+
+    def user_log_arrays(self, user_id):
+        with self._session() as s:
+            rows = s.exec(
+                select(WaterLog.ts_utc, WaterLog.amount_ml).where(WaterLog.user_id == user_id)
+            ).all()
+        ts = epoch_seconds([r[0] for r in rows])
+        amounts = np.fromiter((r[1] for r in rows), dtype=np.int64, count=len(rows))
+        return ts, amounts
+
+    def logs_after(self, log_id, since_utc, limit):
+        with self._session() as s:
+            rows = s.exec(
+                select(WaterLog.id, WaterLog.user_id, WaterLog.ts_utc, WaterLog.amount_ml)
+                .where(WaterLog.id > log_id)
+                .where(WaterLog.ts_utc >= since_utc)
+                .order_by(WaterLog.id)
+                .limit(limit)
+            ).all()
+        return (
+            np.array([r[0] for r in rows], dtype=np.int64),
+            np.array([r[1] for r in rows], dtype=np.int64),
+            epoch_seconds([r[2] for r in rows]),
+            np.array([r[3] for r in rows], dtype=np.int64),
+        )
+
+    def reminder_periods_between(self, start_utc, end_utc):
+        with self._session() as s:
+            return s.exec(
+                select(ReminderLog.user_id, ReminderLog.period)
+                .where(ReminderLog.ts_utc >= start_utc)
+                .where(ReminderLog.ts_utc < end_utc)
+            ).all()
+
+    def reminders_after(self, reminder_id, since_utc, limit):
+        with self._session() as s:
+            rows = s.exec(
+                select(ReminderLog.id, ReminderLog.user_id, ReminderLog.ts_utc, ReminderLog.period)
+                .where(ReminderLog.id > reminder_id)
+                .where(ReminderLog.ts_utc >= since_utc)
+                .order_by(ReminderLog.id)
+                .limit(limit)
+            ).all()
+        return (
+            np.array([r[0] for r in rows], dtype=np.int64),
+            np.array([r[1] for r in rows], dtype=np.int64),
+            epoch_seconds([r[2] for r in rows]),
+            [r[3] for r in rows],
+        )
+
+    def get_or_create_sweep_run(self, local_date, hour, period):
+        with self._session() as s:
+            run = s.exec(
+                select(SweepRun)
+                .where(SweepRun.local_date == local_date)
+                .where(SweepRun.hour == hour)
+                .where(SweepRun.period == period)
+            ).first()
+            if run is None:
+                ts = _utcnow()
+                run = SweepRun(local_date=local_date, hour=hour, period=period, started_utc=ts, updated_utc=ts)
+                s.add(run)
+                s.commit()
+                s.refresh(run)
+            return run
+
+    def running_sweep_runs(self):
+        with self._session() as s:
+            return s.exec(select(SweepRun).where(SweepRun.status == "running")).all()
+
+    def save_sweep_run(self, run, reminders=()):
+        with self._session() as s:
+            run.updated_utc = _utcnow()
+            s.add(run)
+            s.add_all(list(reminders))
+            s.commit()
+
+
+class _Series:
+    """Журнал одного пользователя: отсортированные массивы времени (мкс) и префиксных сумм."""
+
+    __slots__ = ("ts", "amounts", "cum", "ids")
+
+    def __init__(self):
+        self.ts = array("q")
+        self.amounts = array("q")
+        self.cum = array("q")  # cum[i] = amounts[0] + ... + amounts[i]
+        self.ids = array("q")  # id записи в общей ленте
+
+    def _rebuild_cum(self, start: int):
+        total = self.cum[start - 1] if start > 0 else 0
+        del self.cum[start:]
+        for a in self.amounts[start:]:
+            total += a
+            self.cum.append(total)
+
+    def insert(self, ts_us: int, amount: int, log_id: int):
+        if not self.ts or ts_us >= self.ts[-1]:
+            # Обычный случай — запись «сейчас», в конец
+            self.ts.append(ts_us)
+            self.amounts.append(amount)
+            self.ids.append(log_id)
+            self.cum.append((self.cum[-1] if self.cum else 0) + amount)
+            return
+        i = bisect_right(self.ts, ts_us)
+        self.ts.insert(i, ts_us)
+        self.amounts.insert(i, amount)
+        self.ids.insert(i, log_id)
+        self._rebuild_cum(i)
+
+    def delete_range(self, start_us: int, end_us: int) -> array:
+        """Удаляет записи интервала; возвращает их id в общей ленте."""
+        lo, hi = bisect_left(self.ts, start_us), bisect_left(self.ts, end_us)
+        deleted = self.ids[lo:hi]
+        if lo < hi:
+            del self.ts[lo:hi]
+            del self.amounts[lo:hi]
+            del self.ids[lo:hi]
+            self._rebuild_cum(lo)
+        return deleted
+
+    def _prefix(self, i: int) -> int:
+        return self.cum[i - 1] if i > 0 else 0
+
+    def range_sum(self, start_us: int, end_us: int) -> int:
+        return self._prefix(bisect_left(self.ts, end_us)) - self._prefix(bisect_left(self.ts, start_us))
+
+    def bucket_sums(self, bounds_us: np.ndarray) -> np.ndarray:
+        """Суммы между соседними границами (векторный бинарный поиск по префиксным суммам)."""
+        if not self.ts:
+            return np.zeros(bounds_us.size - 1, dtype=np.int64)
+        ts = np.frombuffer(self.ts, dtype=np.int64)
+        cum = np.concatenate(([0], np.frombuffer(self.cum, dtype=np.int64)))
+        return np.diff(cum[np.searchsorted(ts, bounds_us, side="left")])
+
+
+def _to_us(dt: datetime) -> int:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(round(dt.timestamp() * 1_000_000))
+
+
+class InMemoryHydrationRepository(HydrationRepository):
+    """Реализация в памяти процесса (бенчмарки, тесты)."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._users: dict[int, User] = {}
+        self._user_ids = array("q")  # id по возрастанию (выдаются последовательно)
+        self._by_tg: dict[int, int] = {}
+        self._series: dict[int, _Series] = {}
+        # Общая лента записей для инкрементальных потребителей (logs_after)
+        self._feed_uid = array("q")
+        self._feed_ts = array("q")
+        self._feed_amount = array("q")
+        self._feed_alive = bytearray()  # 0 — запись удалена (не отдаётся из logs_after, как в SQL)
+        self._reminders: list[tuple[int, int, str]] = []  # (user_id, ts_us, period)
+        self._runs: dict[int, SweepRun] = {}
+
+    def get_user(self, tg_id):
+        with self._lock:
+            user_id = self._by_tg.get(tg_id)
+            return self._users.get(user_id) if user_id is not None else None
+
+    def get_user_by_id(self, user_id):
+        with self._lock:
+            return self._users.get(user_id)
+
+    def get_or_create_user(self, tg_id, bot_id=None):
+        with self._lock:
+            u = self.get_user(tg_id)
+            if u is None:
+                u = User(id=len(self._user_ids) + 1, tg_id=tg_id, bot_id=bot_id)
+                self._users[u.id] = u
+                self._user_ids.append(u.id)
+                self._by_tg[tg_id] = u.id
+            elif bot_id and u.bot_id != bot_id:
+                u.bot_id = bot_id
+            return u
+
+    def update_user(self, user, **fields):
+        with self._lock:
+            for k, v in fields.items():
+                setattr(user, k, v)
+            return user
+
+    def users_after(self, cursor, limit):
+        with self._lock:
+            i = bisect_right(self._user_ids, cursor)
+            return [self._users[uid] for uid in self._user_ids[i:i + limit]]
+
+    def append_log(self, user_id, ts_utc, amount_ml, source):
+        ts_us = _to_us(ts_utc)
+        with self._lock:
+            self._feed_uid.append(user_id)
+            self._feed_ts.append(ts_us)
+            self._feed_amount.append(amount_ml)
+            self._feed_alive.append(1)
+            self._series.setdefault(user_id, _Series()).insert(ts_us, amount_ml, len(self._feed_uid))
+
+    def delete_logs(self, user_id, start_utc, end_utc):
+        with self._lock:
+            series = self._series.get(user_id)
+            if series:
+                for log_id in series.delete_range(_to_us(start_utc), _to_us(end_utc)):
+                    self._feed_alive[log_id - 1] = 0
+
+    def range_total(self, user_id, start_utc, end_utc):
+        with self._lock:
+            series = self._series.get(user_id)
+            return series.range_sum(_to_us(start_utc), _to_us(end_utc)) if series else 0
+
+    def daily_totals(self, user_id, start_utc, days):
+        bounds = _to_us(start_utc) + np.arange(days + 1, dtype=np.int64) * _DAY_US
+        with self._lock:
+            series = self._series.get(user_id)
+            if not series:
+                return [0] * days
+            return series.bucket_sums(bounds).tolist()
+
+    def totals_for_users(self, user_ids, start_utc, end_utc):
+        start_us, end_us = _to_us(start_utc), _to_us(end_utc)
+        out = {}
+        with self._lock:
+            for user_id in user_ids:
+                series = self._series.get(user_id)
+                if series and series.ts:
+                    out[user_id] = series.range_sum(start_us, end_us)
+        return out
+
+    def user_log_arrays(self, user_id):
+        with self._lock:
+            series = self._series.get(user_id)
+            if not series:
+                return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+            ts = np.frombuffer(series.ts, dtype=np.int64) // 1_000_000
+            return ts, np.frombuffer(series.amounts, dtype=np.int64).copy()
+
+    def logs_after(self, log_id, since_utc, limit):
+        # id записи — её позиция в ленте (с 1)
+        since_us = _to_us(since_utc)
+        with self._lock:
+            uid = np.frombuffer(self._feed_uid, dtype=np.int64)[log_id:].copy()
+            ts = np.frombuffer(self._feed_ts, dtype=np.int64)[log_id:].copy()
+            amount = np.frombuffer(self._feed_amount, dtype=np.int64)[log_id:].copy()
+            alive = np.frombuffer(self._feed_alive, dtype=np.uint8)[log_id:].astype(bool)
+        ids = np.arange(log_id + 1, log_id + 1 + uid.size, dtype=np.int64)
+        keep = np.flatnonzero(alive & (ts >= since_us))[:limit]
+        return ids[keep], uid[keep], ts[keep] // 1_000_000, amount[keep]
+
+    def reminder_periods_between(self, start_utc, end_utc):
+        start_us, end_us = _to_us(start_utc), _to_us(end_utc)
+        with self._lock:
+            return [(u, p) for u, ts, p in self._reminders if start_us <= ts < end_us]
+
+    def reminders_after(self, reminder_id, since_utc, limit):
+        # id записи — её позиция в журнале напоминаний (с 1)
+        since_us = _to_us(since_utc)
+        with self._lock:
+            rows = [
+                (i + 1, r) for i, r in enumerate(self._reminders[reminder_id:], start=reminder_id)
+                if r[1] >= since_us
+            ][:limit]
+        return (
+            np.array([i for i, _ in rows], dtype=np.int64),
+            np.array([r[0] for _, r in rows], dtype=np.int64),
+            np.array([r[1] // 1_000_000 for _, r in rows], dtype=np.int64),
+            [r[2] for _, r in rows],
+        )
+
+    def get_or_create_sweep_run(self, local_date, hour, period):
+        with self._lock:
+            for run in self._runs.values():
+                if (run.local_date, run.hour, run.period) == (local_date, hour, period):
+                    return run
+            ts = _utcnow()
+            run = SweepRun(
+                id=len(self._runs) + 1, local_date=local_date, hour=hour, period=period,
+                started_utc=ts, updated_utc=ts,
+            )
+            self._runs[run.id] = run
+            return run
+
+    def running_sweep_runs(self):
+        with self._lock:
+            return [r for r in self._runs.values() if r.status == "running"]
+
+    def save_sweep_run(self, run, reminders=()):
+        with self._lock:
+            run.updated_utc = _utcnow()
+            self._runs[run.id] = run
+            self._reminders.extend((r.user_id, _to_us(r.ts_utc), r.period) for r in reminders)
+
+
+_BACKENDS = {
+    "sql": SqlHydrationRepository,
+    "memory": InMemoryHydrationRepository,
+}
+_repository: HydrationRepository | None = None
+
+
+def get_repository() -> HydrationRepository:
+    """Репозиторий, выбранный настройкой HYDRATION_REPOSITORY (создаётся при первом обращении)."""
+    global _repository
+    if _repository is None:
+        factory = _BACKENDS.get(settings.HYDRATION_REPOSITORY)
+        if factory is None:
+            raise ValueError(f"unknown HYDRATION_REPOSITORY: {settings.HYDRATION_REPOSITORY}")
+        _repository = factory()
+    return _repository
+
+
+def set_repository(repo: HydrationRepository) -> None:
+    """Подменяет репозиторий (например, изолированный InMemoryHydrationRepository в тестах)."""
+    global _repository
+    _repository = repo
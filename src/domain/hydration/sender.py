@@ -0,0 +1,17 @@
+"""
+Канал доставки напоминаний.
+
+Доменный слой зависит только от этого интерфейса; реализация — пул ботов
+Telegram (src.bot.pool.BotPool), который передаётся в сервис напоминаний
+из процесса бота или планировщика.
+"""
+
+from abc import ABC, abstractmethod
+
+
+class MessageSender(ABC):
+    rate_per_sec: float  # лимит отправки на одного бота, сообщений в секунду
+
+    @abstractmethod
+    async def send_message(self, bot_id: int | None, **kwargs):
+        """Отправляет сообщение через бота `bot_id` (неизвестный или пустой — основной бот)."""
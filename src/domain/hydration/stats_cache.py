@@ -0,0 +1,155 @@
+"""
+Кэш посуточной статистики (/stats/days).
+
+Два уровня:
+- готовые ответы по ключу (пользователь, days, локальная дата) — сбрасываются
+  любой записью пользователя (/log, /reset, /goal), т.к. содержат текущий день и цель;
+- итоги закрытых (прошедших) дней — не меняются, хранятся до вытеснения по LRU.
+
+StatsCache — интерфейс, чтобы для нескольких воркеров можно было подставить
+внешний бэкенд (Redis и т.п.); InMemoryStatsCache — реализация в процессе.
+"""
+
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from src.shared.config import settings
+
+
+class StatsCache(ABC):
+    @abstractmethod
+    def get_window(self, user_id: int, days: int, local_date: str) -> dict | None:
+        """Готовый ответ за окно `days` дней, заканчивающееся `local_date`."""
+
+    @abstractmethod
+    def set_window(self, user_id: int, days: int, local_date: str, value: dict) -> None:
+        ...
+
+    @abstractmethod
+    def get_closed_days(self, user_id: int, dates: list[str]) -> dict[str, int]:
+        """Итоги закрытых дней из `dates`, которые есть в кэше."""
+
+    @abstractmethod
+    def set_closed_days(self, user_id: int, totals: dict[str, int]) -> None:
+        ...
+
+    @abstractmethod
+    def invalidate_user(self, user_id: int) -> None:
+        """Сбрасывает готовые ответы пользователя (итоги закрытых дней остаются)."""
+
+
+class _UserEntry:
+    __slots__ = ("closed", "windows", "size")
+
+    def __init__(self):
+        self.closed: dict[str, int] = {}
+        self.windows: dict[tuple[int, str], dict] = {}
+        self.size = 0
+
+
+class InMemoryStatsCache(StatsCache):
+    """LRU по пользователям с бюджетом памяти (оценка размера записей в байтах)."""
+
+    MAX_CLOSED_DAYS = 62  # окно /stats/days — не больше 31 дня
+    USER_BYTES = 240
+    CLOSED_DAY_BYTES = 120
+    WINDOW_BYTES = 200
+    WINDOW_DAY_BYTES = 160
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._users: OrderedDict[int, _UserEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def _entry(self, user_id: int, create: bool = False) -> _UserEntry | None:
+        entry = self._users.get(user_id)
+        if entry is None and create:
+            entry = _UserEntry()
+            entry.size = self.USER_BYTES
+            self.bytes += entry.size
+            self._users[user_id] = entry
+        if entry is not None:
+            self._users.move_to_end(user_id)
+        return entry
+
+    def _resize(self, entry: _UserEntry, delta: int):
+        entry.size += delta
+        self.bytes += delta
+        while self.bytes > self.max_bytes and len(self._users) > 1:
+            _, evicted = self._users.popitem(last=False)
+            self.bytes -= evicted.size
+
+    def get_window(self, user_id, days, local_date):
+        with self._lock:
+            entry = self._entry(user_id)
+            return entry.windows.get((days, local_date)) if entry else None
+
+    def set_window(self, user_id, days, local_date, value):
+        with self._lock:
+            entry = self._entry(user_id, create=True)
+            key = (days, local_date)
+            delta = 0 if key in entry.windows else self.WINDOW_BYTES + days * self.WINDOW_DAY_BYTES
+            # Ответы за прошлые даты больше не понадобятся
+            for stale in [k for k in entry.windows if k[1] != local_date]:
+                delta -= self.WINDOW_BYTES + stale[0] * self.WINDOW_DAY_BYTES
+                del entry.windows[stale]
+            entry.windows[key] = value
+            self._resize(entry, delta)
+
+    def get_closed_days(self, user_id, dates):
+        with self._lock:
+            entry = self._entry(user_id)
+            if not entry:
+                return {}
+            return {d: entry.closed[d] for d in dates if d in entry.closed}
+
+    def set_closed_days(self, user_id, totals):
+        if not totals:
+            return
+        with self._lock:
+            entry = self._entry(user_id, create=True)
+            before = len(entry.closed)
+            entry.closed.update(totals)
+            if len(entry.closed) > self.MAX_CLOSED_DAYS:
+                # ISO-даты сортируются хронологически — отбрасываем самые старые
+                for d in sorted(entry.closed)[: len(entry.closed) - self.MAX_CLOSED_DAYS]:
+                    del entry.closed[d]
+            self._resize(entry, (len(entry.closed) - before) * self.CLOSED_DAY_BYTES)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            entry = self._users.get(user_id)
+            if not entry or not entry.windows:
+                return
+            delta = -sum(self.WINDOW_BYTES + days * self.WINDOW_DAY_BYTES for days, _ in entry.windows)
+            entry.windows.clear()
+            entry.size += delta
+            self.bytes += delta
+
+
+_BACKENDS = {
+    "memory": lambda: InMemoryStatsCache(max_bytes=settings.STATS_CACHE_MAX_BYTES),
+}
+_cache: StatsCache | None = None
+
+
+def get_stats_cache() -> StatsCache:
+    """Кэш, выбранный настройкой STATS_CACHE_BACKEND (создаётся при первом обращении)."""
+    global _cache
+    if _cache is None:
+        factory = _BACKENDS.get(settings.STATS_CACHE_BACKEND)
+        if factory is None:
+            raise ValueError(f"unknown STATS_CACHE_BACKEND: {settings.STATS_CACHE_BACKEND}")
+        _cache = factory()
+    return _cache
+
+
+def set_stats_cache(cache: StatsCache) -> None:
+    """Подменяет кэш (внешний бэкенд или изолированный экземпляр в тестах)."""
+    global _cache
+    _cache = cache
@@ -0,0 +1,39 @@
+"""
+Пробный прогон напоминаний (capacity planning): сколько пользователей получили бы
+напоминание в заданный час и сколько заняла бы рассылка при лимитах ботов.
+Сообщения не отправляются, счётчики не меняются.
+
+Пример: python -m src.scheduler.reminder_dry_run --hour 18 --period evening --date 2026-10-19
+"""
+
+import argparse
+import json
+import logging
+from datetime import date
+
+from src.shared.db import init_db
+from src.domain.hydration.reminder_service import HydrationReminderService, PERIOD_TARGETS
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пробный прогон напоминаний без отправки")
+    parser.add_argument(
+        "--hour", type=int, required=True, choices=range(24), metavar="HOUR",
+        help="час проверки (0-23, DEFAULT_TZ)",
+    )
+    parser.add_argument("--period", choices=list(PERIOD_TARGETS), help="период (по умолчанию — все)")
+    parser.add_argument("--date", type=date.fromisoformat, help="дата YYYY-MM-DD (по умолчанию — сегодня)")
+    args = parser.parse_args()
+
+    init_db()
+    report = HydrationReminderService().simulate(args.hour, args.period, args.date)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
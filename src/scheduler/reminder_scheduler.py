@@ -5,8 +5,9 @@
 
 import asyncio
 import logging
-from aiogram import Bot
-from src.shared.config import settings
+from src.shared.db import init_db
+from src.bot.pool import BotPool
+from src.bot.keyboards import reminder_keyboard
 from src.domain.hydration.reminder_service import HydrationReminderService
 
 # Настройка логирования
@@ -21,13 +22,16 @@ async def main():
     """Основная функция для запуска сервиса напоминаний."""
     logger.info("Запуск сервиса напоминаний о питье воды")
     
-    # Создаем бота для отправки уведомлений
-    bot = Bot(token=settings.BOT_TOKEN)
+    # Создаем пул ботов (по одному на токен) для отправки уведомлений
+    bots = BotPool()
     
     # Инициализируем сервис напоминаний
-    reminder_service = HydrationReminderService(bot)
+    reminder_service = HydrationReminderService(bots, reply_markup=reminder_keyboard)
     
     try:
+        # Схема БД (новые таблицы/колонки) — до первой проверки напоминаний
+        init_db()
+        
         # Запускаем сервис
         await reminder_service.start()
         logger.info("Сервис напоминаний успешно запущен")
@@ -43,7 +47,7 @@ async def main():
     finally:
         # Останавливаем сервис
         await reminder_service.stop()
-        await bot.session.close()
+        await bots.close()
         logger.info("Сервис напоминаний остановлен")
 
 
@@ -4,6 +4,7 @@ class Settings(BaseSettings):
     BOT_TOKEN: str
     BOT_USERNAME: str | None = None
     ADDITIONAL_BOT_TOKENS: str | None = None  # comma-separated optional tokens for multi-bot setups
+    BOT_SEND_RATE_PER_SEC: float = 25  # per-bot message rate (Telegram allows ~30/s per bot)
 
     DATABASE_URL: str = "sqlite:////data/water.db"
     JOBSTORE_URL: str = "sqlite:////data/jobs.sqlite"
@@ -16,6 +17,41 @@ class Settings(BaseSettings):
     INITDATA_TTL: int = 3600
     DEFAULT_TZ: str = "UTC"
     DEBUG_AUTH: bool = False
+    ADMIN_TG_IDS: str | None = None  # comma-separated Telegram ids with access to /api/admin
+
+    # Cohort stats batch job
+    COHORT_STATS_INTERVAL_MIN: int = 60
+    COHORT_STATS_DAYS: int = 30
+    COHORT_STATS_CHUNK: int = 5000
+    COHORT_REMINDER_WINDOW_MIN: int = 120  # intake within this window counts as a reminder response
+
+    # Adaptive reminders: skip users whose intake profile predicts they hit the period target anyway
+    REMINDER_ADAPTIVE: bool = True
+    REMINDER_PROFILE_DAYS: int = 28
+    REMINDER_PREDICT_MIN_DAYS: int = 7
+    REMINDER_PREDICT_CONFIDENCE: float = 0.8
+
+    # Reminder sweeps are processed and checkpointed in chunks of users
+    REMINDER_SWEEP_CHUNK: int = 500
+    REMINDER_SHUTDOWN_DEADLINE_SEC: float = 25
+
+    # API throttling (per Telegram user id) and global admission control
+    RATE_LIMIT_READ_PER_MIN: int = 120
+    RATE_LIMIT_READ_BURST: int = 30
+    RATE_LIMIT_WRITE_PER_MIN: int = 60
+    RATE_LIMIT_WRITE_BURST: int = 15
+    RATE_LIMIT_MAX_KEYS: int = 10000
+    API_MAX_CONCURRENCY: int = 64
+
+    # Responses smaller than this are sent uncompressed
+    COMPRESSION_MIN_SIZE: int = 1024
+
+    # /stats/days response cache ("memory" — in-process; other backends plug in via stats_cache)
+    STATS_CACHE_BACKEND: str = "memory"
+    STATS_CACHE_MAX_BYTES: int = 16 * 1024 * 1024
+
+    # Hydration data backend: "sql" (shared DB) or "memory" (per-process, for benchmarks/tests)
+    HYDRATION_REPOSITORY: str = "sql"
 
     # Dev options
     DEV_ALLOW_NO_INITDATA: bool = True
@@ -23,4 +59,16 @@ class Settings(BaseSettings):
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
+    def bot_tokens(self) -> list[str]:
+        """BOT_TOKEN и все ADDITIONAL_BOT_TOKENS (основной — первым)."""
+        tokens = [self.BOT_TOKEN]
+        if self.ADDITIONAL_BOT_TOKENS:
+            tokens += [t.strip() for t in self.ADDITIONAL_BOT_TOKENS.split(",") if t.strip()]
+        return tokens
+
+def bot_id_from_token(token: str) -> int | None:
+    """Числовой id бота — часть токена до двоеточия (сам токен нигде не храним)."""
+    head = token.split(":", 1)[0]
+    return int(head) if head.isdigit() else None
+
 settings = Settings()
@@ -1,3 +1,8 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event, inspect, text
 from sqlmodel import SQLModel, create_engine, Session
 from src.shared.config import settings
 import os
@@ -14,6 +19,50 @@ engine = create_engine(settings.DATABASE_URL, echo=False, connect_args=connect_a
 
 def init_db():
     SQLModel.metadata.create_all(engine)
+    _add_missing_columns()
+
+def _add_missing_columns():
+    """create_all не добавляет новые колонки в уже существующие таблицы —
+    досоздаём nullable-колонки вручную (без полноценных миграций)."""
+    insp = inspect(engine)
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            if not insp.has_table(table.name):
+                continue
+            existing = {c["name"] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name in existing or not col.nullable:
+                    continue
+                col_type = col.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{col.name}" {col_type}'))
 
 def session():
-    return Session(engine)
\ No newline at end of file
+    return Session(engine)
+
+@contextmanager
+def count_queries():
+    """Считает SQL-запросы и время в БД внутри блока — только запросы текущего
+    потока: события engine общие, запросы других запросов/потоков не учитываются
+    и не затрагиваются."""
+    stats = {"queries": 0, "db_time_ms": 0.0}
+    owner = threading.get_ident()
+    started: list[float] = []
+
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == owner:
+            started.append(time.perf_counter())
+
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        # Запрос мог начаться до входа в блок — тогда начала нет, пропускаем
+        if threading.get_ident() != owner or not started:
+            return
+        stats["queries"] += 1
+        stats["db_time_ms"] += (time.perf_counter() - started.pop()) * 1000
+
+    event.listen(engine, "before_cursor_execute", _before)
+    event.listen(engine, "after_cursor_execute", _after)
+    try:
+        yield stats
+    finally:
+        event.remove(engine, "before_cursor_execute", _before)
+        event.remove(engine, "after_cursor_execute", _after)
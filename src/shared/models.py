@@ -7,6 +7,7 @@ class User(SQLModel, table=True):
     tg_id: int = Field(index=True, unique=True)
     goal_ml: int = Field(default=2000)
     default_glass_ml: int = Field(default=250)
+    bot_id: Optional[int] = Field(default=None)  # бот (из пула токенов), через который пользователь открыл приложение
 
     logs: list["WaterLog"] = Relationship(back_populates="user")
 
@@ -18,3 +19,27 @@ class WaterLog(SQLModel, table=True):
     source: str
 
     user: Optional[User] = Relationship(back_populates="logs")
+
+
+class ReminderLog(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    ts_utc: datetime = Field(index=True)
+    period: str
+
+class SweepRun(SQLModel, table=True):
+    """Прогон проверки напоминаний с чекпоинтом для возобновления после рестарта."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    local_date: str = Field(index=True)  # локальная дата (DEFAULT_TZ) в ISO-формате
+    hour: int
+    period: str
+    status: str = Field(default="running")  # running | done | expired
+    last_user_id: int = Field(default=0)  # курсор: последний обработанный User.id
+    report: str = Field(default="{}")  # JSON со счётчиками прогона
+    started_utc: datetime
+    updated_utc: datetime
+
+class CohortSnapshot(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    created_utc: datetime
+    payload: str  # JSON с агрегатами (см. src/domain/hydration/cohort_stats.py)